@@ -11,7 +11,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 from datetime import timedelta
 SECRET_KEY = 'django-insecure-bn%keu+9aqq763+#(urz2!q^69guosw8_pb@0!01z_-iljh+vy'
 
@@ -96,6 +96,7 @@ CORS_ALLOW_HEADERS = [
     'authorization',
     'content-type',
     'dnt',
+    'idempotency-key',
     'origin',
     'user-agent',
     'x-csrftoken',
@@ -119,6 +120,85 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+REDIS_URL = config('REDIS_URL', default='')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Whether the default cache is shared by every process. Dashboard snapshots
+# are only cached when it is: with the per-process fallback, a version bump
+# made in one worker (or the projector) never reaches the others. Set it for
+# a cache other than REDIS_URL, or for single-process runs.
+CACHE_IS_SHARED = config('CACHE_IS_SHARED', default=bool(REDIS_URL), cast=bool)
+
+# Seconds a per-student dashboard snapshot may be served from the cache.
+# Writes invalidate snapshots immediately; this only bounds their lifetime.
+DASHBOARD_CACHE_TIMEOUT = config('DASHBOARD_CACHE_TIMEOUT', default=300, cast=int)
+
+# Maximum number of items accepted by POST /api/report/update/batch
+PROGRESS_BATCH_MAX_SIZE = config('PROGRESS_BATCH_MAX_SIZE', default=200, cast=int)
+
+# Lesson player heartbeats are buffered per process and written in bulk by a
+# background thread every this many seconds, or sooner once this many
+# (student, lesson) keys are pending
+HEARTBEAT_FLUSH_INTERVAL = config('HEARTBEAT_FLUSH_INTERVAL', default=60, cast=int)
+HEARTBEAT_FLUSH_SIZE = config('HEARTBEAT_FLUSH_SIZE', default=500, cast=int)
+
+# Responses to write requests carrying an Idempotency-Key are replayed for
+# this many seconds; the pending marker bounds how long a crashed request
+# blocks retries of its key
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=86400, cast=int)
+IDEMPOTENCY_PENDING_TIMEOUT = config('IDEMPOTENCY_PENDING_TIMEOUT', default=60, cast=int)
+
+# 'direct' writes Progress in the request. 'events' appends to ProgressEvent
+# and answers 202; the project_progress_events command applies the events.
+PROGRESS_WRITE_MODE = config('PROGRESS_WRITE_MODE', default='direct')
+# Events younger than this are left for the next batch so that ids
+# committed out of order are never skipped
+PROGRESS_PROJECTOR_SETTLE_SECONDS = config('PROGRESS_PROJECTOR_SETTLE_SECONDS', default=2, cast=int)
+
+# Limits for POST /api/report/activities/batch: items per request, rows per
+# INSERT, and how far back a client timestamp may be
+ACTIVITY_BATCH_MAX_SIZE = config('ACTIVITY_BATCH_MAX_SIZE', default=5000, cast=int)
+ACTIVITY_BATCH_CHUNK_SIZE = config('ACTIVITY_BATCH_CHUNK_SIZE', default=500, cast=int)
+ACTIVITY_BATCH_MAX_AGE_DAYS = config('ACTIVITY_BATCH_MAX_AGE_DAYS', default=7, cast=int)
+
+# Re-score the recommendations of the touched course after each progress
+# status change (see RecommendationService.refresh_recommendations)
+RECOMMENDATION_REFRESH_ON_PROGRESS = config('RECOMMENDATION_REFRESH_ON_PROGRESS', default=True, cast=bool)
+
+# Recommendation strategies to skip, by name, e.g. "similar_lessons,reviews"
+RECOMMENDATION_DISABLED_STRATEGIES = config('RECOMMENDATION_DISABLED_STRATEGIES', default='', cast=Csv())
+# Optional per-strategy budgets, e.g. {'similar_lessons': {'max_ms': 50, 'max_queries': 1}};
+# a strategy over its budget is skipped and reported instead of delaying the run
+RECOMMENDATION_STRATEGY_BUDGETS = {}
+# Overrides for RecommendationScorer.DEFAULT_WEIGHTS, in priority points per
+# unit of feature, e.g. {'recency': 8.0, 'popularity': 0.0}
+RECOMMENDATION_SCORE_WEIGHTS = {}
+
+# Raw activities older than this many days are compacted into
+# ActivitySummary by the compact_activities command
+ACTIVITY_RETENTION_DAYS = config('ACTIVITY_RETENTION_DAYS', default=90, cast=int)
+
+# On PostgreSQL, manage_activity_partitions keeps monthly activities
+# partitions created this many months ahead
+ACTIVITY_PARTITION_MONTHS_AHEAD = config('ACTIVITY_PARTITION_MONTHS_AHEAD', default=3, cast=int)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -189,4 +269,6 @@ if 'test' in sys.argv:
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': ':memory:',   # in‑memory DB, fast and isolated
         }
-    }
\ No newline at end of file
+    }
+    # The test runner is a single process
+    CACHE_IS_SHARED = True
\ No newline at end of file
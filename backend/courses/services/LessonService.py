@@ -82,6 +82,9 @@ class LessonService:
                     order=order,
                     estimated_minutes=estimated_minutes
                 )
+                # A new lesson can become the next unfinished lesson of the course
+                from report.services.CourseProgressService import CourseProgressService
+                CourseProgressService.rebuild(course_ids=[course.id])
                 return {'success': True, 'lesson': lesson}
         except Course.DoesNotExist:
             return {'success': False, 'error': 'Course not found'}
@@ -0,0 +1,68 @@
+"""
+dashboard/serializers.py - Dashboard serializers
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+from rest_framework import serializers
+
+
+class MentorStudentListSerializer(serializers.Serializer):
+    """Query parameters for the paginated mentor student list"""
+    
+    sort = serializers.ChoiceField(
+        choices=['created', 'progress', 'time_spent', 'last_activity'],
+        default='created'
+    )
+    order = serializers.ChoiceField(choices=['asc', 'desc'], default='desc')
+    band = serializers.ChoiceField(choices=['low', 'medium', 'high'], required=False)
+    q = serializers.CharField(required=False, max_length=150)
+    cursor = serializers.CharField(required=False)
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=100, default=25)
+
+
+class StreakRankingQuerySerializer(serializers.Serializer):
+    """Query parameters for the mentor streak ranking"""
+    
+    sort = serializers.ChoiceField(choices=['longest', 'current', 'count'], default='longest')
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=100, default=25)
+
+
+class TimeSeriesQuerySerializer(serializers.Serializer):
+    """
+    Query parameters for the student time series
+    Either `days` (the last N days, including today) or a `start`/`end`
+    range, which defaults to the same 30 days; the number of
+    buckets the range spans at `granularity` is capped at MAX_POINTS.
+    """
+    
+    MAX_POINTS = 366
+    BUCKET_DAYS = {'day': 1, 'week': 7, 'month': 28}
+    
+    days = serializers.IntegerField(required=False, min_value=1, max_value=365)
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    granularity = serializers.ChoiceField(choices=['day', 'week', 'month'], default='day')
+    
+    def validate(self, attrs):
+        # The student's local day, passed in by the view
+        today = self.context.get('today') or timezone.now().date()
+        if 'start' in attrs or 'end' in attrs:
+            if 'days' in attrs:
+                raise serializers.ValidationError('Pass either days or start/end, not both')
+            end = attrs.get('end', today)
+            start = attrs.get('start', end - timedelta(days=29))
+        else:
+            end = today
+            start = end - timedelta(days=attrs.get('days', 30) - 1)
+        
+        if start > end:
+            raise serializers.ValidationError('start must be on or before end')
+        
+        points = (end - start).days // self.BUCKET_DAYS[attrs['granularity']] + 1
+        if points > self.MAX_POINTS:
+            raise serializers.ValidationError(
+                f"Range too long for granularity={attrs['granularity']} (at most {self.MAX_POINTS} points)"
+            )
+        
+        return {'start': start, 'end': end, 'granularity': attrs['granularity']}
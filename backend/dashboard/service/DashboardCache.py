@@ -0,0 +1,98 @@
+"""
+dashboard/service/DashboardCache.py - Versioned per-student dashboard snapshot cache
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+
+class DashboardCache:
+    """
+    Cache for per-student dashboard snapshots.
+
+    Writers never delete snapshots directly: they bump the student's version
+    key, so the next read builds a fresh snapshot under a new key and the old
+    one simply ages out with its TTL.
+
+    Versions only work when every process sees the same cache, so callers
+    skip caching when is_enabled() is False (CACHE_IS_SHARED unset).
+    """
+
+    VERSION_KEY = 'dashboard:student:{student_id}:version'
+    SNAPSHOT_KEY = 'dashboard:student:{student_id}:v{version}:{day}'
+
+    @staticmethod
+    def is_enabled():
+        """Whether snapshots may be cached, i.e. the cache is shared by every process"""
+        return getattr(settings, 'CACHE_IS_SHARED', False)
+
+    @staticmethod
+    def _initial_version():
+        # Seed missing versions from the clock so an evicted version key can
+        # never resurrect a snapshot written under an older number.
+        return int(time.time() * 1000)
+
+    @staticmethod
+    def get_version(student_id):
+        """Get the current snapshot version for a student"""
+        key = DashboardCache.VERSION_KEY.format(student_id=student_id)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, DashboardCache._initial_version(), timeout=None)
+            version = cache.get(key)
+        return version
+
+    @staticmethod
+    def get_versions(student_ids):
+        """Get the current snapshot versions for many students, {student_id: version}"""
+        keys = {DashboardCache.VERSION_KEY.format(student_id=student_id): student_id for student_id in student_ids}
+        versions = {keys[key]: version for key, version in cache.get_many(list(keys)).items()}
+        missing = [key for key, student_id in keys.items() if student_id not in versions]
+        if missing:
+            initial = DashboardCache._initial_version()
+            for key in missing:
+                cache.add(key, initial, timeout=None)
+            versions.update({keys[key]: version for key, version in cache.get_many(missing).items()})
+        return versions
+    
+    @staticmethod
+    def bump(student_id):
+        """Invalidate every cached snapshot for a student"""
+        if not DashboardCache.is_enabled():
+            return
+        key = DashboardCache.VERSION_KEY.format(student_id=student_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, DashboardCache._initial_version(), timeout=None)
+
+    @staticmethod
+    def _snapshot_key(student_id, version, day=None):
+        # The day is part of the key because the time series and the streak
+        # are relative to "today" in the student's timezone; pass
+        # student.local_date() (UTC when omitted).
+        return DashboardCache.SNAPSHOT_KEY.format(
+            student_id=student_id,
+            version=version,
+            day=(day or timezone.now().date()).isoformat()
+        )
+
+    @staticmethod
+    def get(student_id, version, day=None):
+        """Get the cached snapshot for a student at a given version and local day, or None"""
+        return cache.get(DashboardCache._snapshot_key(student_id, version, day))
+
+    @staticmethod
+    def set(student_id, version, data, day=None):
+        """
+        Store a dashboard snapshot for a student.
+        `version` must be read before the snapshot was built, so a write that
+        lands mid-build leaves this snapshot under an already stale key.
+        """
+        cache.set(
+            DashboardCache._snapshot_key(student_id, version, day),
+            data,
+            timeout=getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300)
+        )
@@ -1,8 +1,18 @@
 """
 dashboard/services/DashboardService.py - Dashboard business logic (SUPER OPTIMIZED)
 """
+import base64
+import json
+import math
+from datetime import timedelta
+
+from django.db.models import Avg, Case, Count, F, Q, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from report.models import Recommendation
 from courses.models import Course, Lesson
+from users.models import User
+from .DashboardCache import DashboardCache
 
 
 class DashboardService:
@@ -10,7 +20,33 @@ class DashboardService:
     
     @staticmethod
     def get_student_dashboard_data(student):
-        """Get complete dashboard data for a student (SUPER OPTIMIZED)"""
+        """
+        Get complete dashboard data for a student (CACHED)
+        Snapshots are versioned per student; progress, activity and
+        recommendation writes bump the version, so repeat loads between
+        writes never touch the database. Without a shared cache every load
+        is built fresh.
+        """
+        try:
+            if not DashboardCache.is_enabled():
+                return DashboardService._build_student_dashboard_data(student)
+            
+            version = DashboardCache.get_version(student.id)
+            today = student.local_date()
+            snapshot = DashboardCache.get(student.id, version, day=today)
+            if snapshot is not None:
+                return {'success': True, 'data': snapshot}
+            
+            result = DashboardService._build_student_dashboard_data(student)
+            if result['success']:
+                DashboardCache.set(student.id, version, result['data'], day=today)
+            return result
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    @staticmethod
+    def _build_student_dashboard_data(student):
+        """Build complete dashboard data for a student (SUPER OPTIMIZED)"""
         try:
             from report.services.ProgressService import ProgressService
             from report.services.ActivityService import ActivityService
@@ -216,60 +252,253 @@ class DashboardService:
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    # Mentor list sort keys -> StudentStats columns (each backed by an index)
+    MENTOR_SORT_FIELDS = {
+        'created': 'student__created_at',
+        'progress': 'completed',
+        'time_spent': 'total_time_minutes',
+        'last_activity': 'last_activity',
+    }
+    
+    # Progress bands as [low, high) percentage ranges
+    MENTOR_PROGRESS_BANDS = {
+        'low': (0, 30),
+        'medium': (30, 70),
+        'high': (70, None),
+    }
+    
+    # Students below this percentage are flagged as needing help
+    NEEDS_HELP_THRESHOLD = 30
+    NEEDS_HELP_PREVIEW_SIZE = 5
+    
+    @staticmethod
+    def _encode_cursor(value, student_id):
+        """Encode a keyset position as an opaque cursor"""
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        payload = json.dumps({'v': value, 'id': student_id})
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+    
     @staticmethod
-    def get_mentor_dashboard_data():
-        """Get dashboard data for mentors (OPTIMIZED)"""
+    def _decode_cursor(cursor, sort_field):
+        """Decode an opaque cursor into (value, student_id)"""
         try:
-            from users.services.UserService import UserService
-            from report.services.ProgressService import ProgressService
-            
-            # Get all students
-            students_result = UserService.get_all_students()
-            if not students_result['success']:
-                return students_result
-            
-            students = students_result['students']
-            
-            # Get stats for each student using optimized method
-            student_data = []
-            for student in students:
-                stats_result = ProgressService.get_student_overall_stats_optimized(student)
-                if stats_result['success']:
-                    stats = stats_result['stats']
-                    student_data.append({
-                        'student_id': student.id,
-                        'student_name': student.full_name,
-                        'student_email': student.email,
-                        'stats': {
-                            'total_lessons_completed': stats['total_lessons_completed'],
-                            'total_time_minutes': stats['total_time_minutes'],
-                            'courses_in_progress': stats['courses_in_progress'],
-                            'overall_progress_percentage': stats['overall_progress_percentage']
-                        }
-                    })
-            
-            # Calculate average completion rate
-            if student_data:
-                avg_completion = sum(
-                    s['stats']['overall_progress_percentage'] for s in student_data
-                ) / len(student_data)
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            value, student_id = payload['v'], int(payload['id'])
+        except (ValueError, KeyError, TypeError):
+            raise ValueError('Invalid cursor')
+        
+        if value is not None and sort_field in ('student__created_at', 'last_activity'):
+            value = parse_datetime(value)
+            if value is None:
+                raise ValueError('Invalid cursor')
+        return value, student_id
+    
+    @staticmethod
+    def _completed_threshold(percentage, total_published_lessons):
+        """Smallest completed count whose progress is >= percentage"""
+        return math.ceil(percentage * total_published_lessons / 100)
+    
+    @staticmethod
+    def _mentor_student_entry(stats, total_published_lessons):
+        """Build one mentor list entry from a StudentStats row"""
+        overall_progress = (
+            (stats.completed / total_published_lessons * 100)
+            if total_published_lessons > 0 else 0
+        )
+        return {
+            'student_id': stats.student_id,
+            'student_name': stats.student.full_name,
+            'student_email': stats.student.email,
+            'stats': {
+                'total_lessons_completed': stats.completed,
+                'total_time_minutes': stats.total_time_minutes,
+                'courses_in_progress': stats.courses_touched,
+                'overall_progress_percentage': round(overall_progress, 2),
+                'last_activity': stats.last_activity
+            }
+        }
+    
+    @staticmethod
+    def get_mentor_dashboard_data(sort='created', order='desc', band=None, q=None, cursor=None, limit=25):
+        """
+        Get dashboard data for mentors (KEYSET PAGINATED)
+        Students are read from the denormalized StudentStats table and paged
+        with a (sort column, student_id) keyset, so each page costs the same
+        no matter how many students there are. Summary figures are only
+        computed for the first page.
+        """
+        try:
+            from report.models import StudentStats
+            from report.services.StatsService import StatsService
+            
+            sort_field = DashboardService.MENTOR_SORT_FIELDS[sort]
+            descending = order == 'desc'
+            
+            total_published_lessons = Lesson.objects.filter(
+                course__is_published=True
+            ).count()
+            
+            if cursor is None:
+                StatsService.ensure_rows()
+            
+            students = StudentStats.objects.filter(
+                student__role='student',
+                student__is_active=True
+            )
+            
+            # Filters
+            page = students
+            if band:
+                low, high = DashboardService.MENTOR_PROGRESS_BANDS[band]
+                page = page.filter(
+                    completed__gte=DashboardService._completed_threshold(low, total_published_lessons)
+                )
+                if high is not None:
+                    page = page.filter(
+                        completed__lt=DashboardService._completed_threshold(high, total_published_lessons)
+                    )
+            if q:
+                page = page.filter(
+                    Q(student__email__startswith=q.lower()) |
+                    Q(student__first_name__istartswith=q) |
+                    Q(student__last_name__istartswith=q)
+                )
+            
+            # Keyset position (NULLs always sort last)
+            if cursor is not None:
+                value, last_id = DashboardService._decode_cursor(cursor, sort_field)
+                id_lookup = 'student_id__lt' if descending else 'student_id__gt'
+                if value is None:
+                    page = page.filter(Q(**{f'{sort_field}__isnull': True, id_lookup: last_id}))
+                else:
+                    value_lookup = f'{sort_field}__lt' if descending else f'{sort_field}__gt'
+                    page = page.filter(
+                        Q(**{value_lookup: value}) |
+                        Q(**{sort_field: value, id_lookup: last_id}) |
+                        Q(**{f'{sort_field}__isnull': True})
+                    )
+            
+            if descending:
+                ordering = [F(sort_field).desc(nulls_last=True), F('student_id').desc()]
             else:
-                avg_completion = 0
-            
-            # Find students needing help (< 30% progress)
-            students_needing_help = [
-                s for s in student_data 
-                if s['stats']['overall_progress_percentage'] < 30
-            ]
+                ordering = [F(sort_field).asc(nulls_last=True), F('student_id').asc()]
+            
+            rows = list(
+                page.select_related('student').order_by(*ordering)[:limit + 1]
+            )
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            
+            next_cursor = None
+            if has_more:
+                last = rows[-1]
+                last_value = last.student.created_at if sort == 'created' else getattr(last, sort_field)
+                next_cursor = DashboardService._encode_cursor(last_value, last.student_id)
+            
+            data = {
+                'students': [
+                    DashboardService._mentor_student_entry(row, total_published_lessons)
+                    for row in rows
+                ],
+                'next_cursor': next_cursor,
+                'has_more': has_more
+            }
             
-            return {
-                'success': True,
-                'data': {
-                    'total_students': len(student_data),
+            if cursor is None:
+                help_threshold = DashboardService._completed_threshold(
+                    DashboardService.NEEDS_HELP_THRESHOLD, total_published_lessons
+                )
+                summary = students.aggregate(
+                    total=Count('student_id'),
+                    avg_completed=Avg('completed'),
+                    needing_help=Count('student_id', filter=Q(completed__lt=help_threshold))
+                )
+                avg_completion = (
+                    (summary['avg_completed'] / total_published_lessons * 100)
+                    if total_published_lessons > 0 and summary['avg_completed'] is not None else 0
+                )
+                
+                # Bounded preview; the full list is available with band=low
+                needing_help = students.filter(
+                    completed__lt=help_threshold
+                ).select_related('student').order_by('completed', 'student_id')[
+                    :DashboardService.NEEDS_HELP_PREVIEW_SIZE
+                ]
+                
+                data.update({
+                    'total_students': summary['total'],
                     'average_completion_rate': round(avg_completion, 2),
-                    'students': student_data,
-                    'students_needing_help': students_needing_help
-                }
-            }
+                    'students_needing_help_count': summary['needing_help'],
+                    'students_needing_help': [
+                        DashboardService._mentor_student_entry(row, total_published_lessons)
+                        for row in needing_help
+                    ]
+                })
+            
+            return {'success': True, 'data': data}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    STREAK_RANKING_FIELDS = {
+        'longest': 'longest_streak',
+        'current': 'current_streak',
+        'count': 'streak_count',
+    }
+    
+    @staticmethod
+    def get_streak_ranking(sort='longest', limit=25):
+        """
+        Rank active students by engagement streaks for mentors
+        The page is ordered and limited in SQL on the stored StudentStats
+        streaks; histories (from the per-student streak cache) are only
+        loaded for the students on it.
+        """
+        try:
+            from report.models import StudentStats
+            from report.services.StatsService import StatsService
+            
+            StatsService.ensure_rows()
+            rows = StudentStats.objects.filter(student__role='student', student__is_active=True)
+            field = DashboardService.STREAK_RANKING_FIELDS[sort]
+            if sort == 'current':
+                # The stored streak is over once the student's local yesterday
+                # was missed, as in summarize_streaks
+                now = timezone.now()
+                zones = rows.order_by().values_list('student__timezone', flat=True).distinct()
+                rows = rows.annotate(ranked_streak=Case(
+                    *[
+                        When(
+                            student__timezone=zone,
+                            last_active_date__gte=timezone.localtime(now, User.get_tzinfo(zone)).date() - timedelta(days=1),
+                            then=F('current_streak')
+                        )
+                        for zone in zones
+                    ],
+                    default=Value(0)
+                ))
+                order = ['-ranked_streak', '-longest_streak', 'student_id']
+            else:
+                order = [f'-{field}', 'student_id']
+            
+            page = list(
+                rows.select_related('student').only(
+                    'student_id', 'student__email', 'student__first_name',
+                    'student__last_name', 'student__timezone'
+                ).order_by(*order)[:limit]
+            )
+            histories = StatsService.get_streak_histories([row.student_id for row in page])
+            
+            entries = []
+            for row in page:
+                student = row.student
+                streaks = StatsService.summarize_streaks(histories[student.id], student.local_date())
+                entries.append({
+                    'student_id': student.id,
+                    'student_name': student.full_name,
+                    'student_email': student.email,
+                    **streaks
+                })
+            return {'success': True, 'data': {'students': entries, 'total_students': rows.count()}}
         except Exception as e:
-            return {'success': False, 'error': str(e)}
\ No newline at end of file
+            return {'success': False, 'error': str(e)}
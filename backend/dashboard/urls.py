@@ -10,4 +10,5 @@ urlpatterns = [
     path('', views.get_dashboard, name='main'),
     path('timeseries', views.get_time_series, name='timeseries'),
     path('distribution', views.get_completion_distribution, name='distribution'),
+    path('streaks', views.get_streaks, name='streaks'),
 ]
\ No newline at end of file
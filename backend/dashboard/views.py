@@ -5,20 +5,30 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
+from .serializers import MentorStudentListSerializer, StreakRankingQuerySerializer, TimeSeriesQuerySerializer
 from .service.DashboardService import DashboardService
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_dashboard(request):
-    """Get dashboard data based on user role"""
+    """
+    Get dashboard data based on user role
+    Mentors may page the student list with ?sort=&order=&band=&q=&cursor=&limit=
+    """
     try:
         user = request.user
         
         if user.role == 'student':
             result = DashboardService.get_student_dashboard_data(user)
         elif user.role == 'mentor':
-            result = DashboardService.get_mentor_dashboard_data()
+            params = MentorStudentListSerializer(data=request.query_params)
+            if not params.is_valid():
+                return Response({
+                    'success': False,
+                    'errors': params.errors
+                }, status=status.HTTP_400_BAD_REQUEST)
+            result = DashboardService.get_mentor_dashboard_data(**params.validated_data)
         else:
             return Response({
                 'success': False,
@@ -54,10 +64,18 @@ def get_time_series(request):
                 'error': 'Only students can access this endpoint'
             }, status=status.HTTP_403_FORBIDDEN)
         
-        days = int(request.query_params.get('days', 30))
+        serializer = TimeSeriesQuerySerializer(
+            data=request.query_params,
+            context={'today': request.user.local_date()}
+        )
+        if not serializer.is_valid():
+            return Response({
+                'success': False,
+                'errors': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
         
         from report.services.ActivityService import ActivityService
-        result = ActivityService.get_daily_time_series(request.user, days=days)
+        result = ActivityService.get_time_series(request.user, **serializer.validated_data)
         
         if not result['success']:
             return Response({
@@ -105,4 +123,50 @@ def get_completion_distribution(request):
         return Response({
             'success': False,
             'error': str(e)
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_streaks(request):
+    """
+    Get engagement streaks based on user role
+    Students get their own streak history; mentors get students ranked
+    with ?sort=longest|current|count&limit=
+    """
+    try:
+        user = request.user
+        
+        if user.role == 'student':
+            from report.services.ActivityService import ActivityService
+            result = ActivityService.get_streak_history(user)
+        elif user.role == 'mentor':
+            params = StreakRankingQuerySerializer(data=request.query_params)
+            if not params.is_valid():
+                return Response({
+                    'success': False,
+                    'errors': params.errors
+                }, status=status.HTTP_400_BAD_REQUEST)
+            result = DashboardService.get_streak_ranking(**params.validated_data)
+        else:
+            return Response({
+                'success': False,
+                'error': 'Invalid user role'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        if not result['success']:
+            return Response({
+                'success': False,
+                'error': result['error']
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'success': True,
+            'data': result['data']
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
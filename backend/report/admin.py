@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Progress, Activity, Recommendation
+from .models import Progress, Activity, Recommendation, LessonNeighbor, StudentStats, CourseProgress, DailyActivity, ActivitySummary, ProgressEvent
 
 
 @admin.register(Progress)
@@ -25,4 +25,51 @@ class RecommendationAdmin(admin.ModelAdmin):
     list_filter = ['priority', 'is_dismissed', 'created_at']
     search_fields = ['student__email', 'lesson__title', 'reason']
     raw_id_fields = ['student', 'lesson']
-    readonly_fields = ['created_at']
\ No newline at end of file
+    readonly_fields = ['created_at']
+
+@admin.register(LessonNeighbor)
+class LessonNeighborAdmin(admin.ModelAdmin):
+    list_display = ['lesson', 'neighbor', 'score', 'students']
+    search_fields = ['lesson__title', 'neighbor__title']
+    raw_id_fields = ['lesson', 'neighbor']
+
+
+@admin.register(StudentStats)
+class StudentStatsAdmin(admin.ModelAdmin):
+    list_display = ['student', 'completed', 'in_progress', 'total_time_minutes', 'courses_touched', 'current_streak', 'last_activity']
+    search_fields = ['student__email']
+    raw_id_fields = ['student']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(CourseProgress)
+class CourseProgressAdmin(admin.ModelAdmin):
+    list_display = ['student', 'course', 'next_lesson', 'completed', 'updated_at']
+    search_fields = ['student__email', 'course__title']
+    raw_id_fields = ['student', 'course', 'next_lesson']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(DailyActivity)
+class DailyActivityAdmin(admin.ModelAdmin):
+    list_display = ['student', 'date', 'minutes', 'sessions', 'lessons_completed']
+    search_fields = ['student__email']
+    raw_id_fields = ['student']
+    date_hierarchy = 'date'
+
+
+@admin.register(ActivitySummary)
+class ActivitySummaryAdmin(admin.ModelAdmin):
+    list_display = ['student', 'lesson', 'date', 'event_type', 'minutes', 'events']
+    list_filter = ['event_type']
+    search_fields = ['student__email']
+    raw_id_fields = ['student', 'lesson']
+    date_hierarchy = 'date'
+
+
+@admin.register(ProgressEvent)
+class ProgressEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'student', 'lesson', 'status', 'time_spent', 'created_at']
+    list_filter = ['status']
+    search_fields = ['student__email', 'lesson__title']
+    raw_id_fields = ['student', 'lesson']
@@ -0,0 +1,141 @@
+"""
+report/idempotency.py - Idempotency-Key support for retried write endpoints
+"""
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+
+def _key_hash(request, key):
+    return hashlib.sha256(f'{request.path}\n{key}'.encode()).hexdigest()
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()[:32]
+
+
+def _is_expired(row, now):
+    """A stored response past its TTL, or a pending claim whose request must have crashed"""
+    if row.status_code is None:
+        timeout = getattr(settings, 'IDEMPOTENCY_PENDING_TIMEOUT', 60)
+    else:
+        timeout = getattr(settings, 'IDEMPOTENCY_KEY_TTL', 86400)
+    return row.created_at < now - timedelta(seconds=timeout)
+
+
+def _claim(user, key_hash, fingerprint):
+    """
+    Claim a key for this request.
+    Returns (row, claimed): claimed is False when another request holds
+    the key, and row is then that request's entry.
+    """
+    for _ in range(2):
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(
+                    user=user, key=key_hash, fingerprint=fingerprint, created_at=now
+                ), True
+        except IntegrityError:
+            pass
+
+        row = IdempotencyKey.objects.filter(user=user, key=key_hash).first()
+        if row is None:
+            # Released by a failed request in between; claim it again
+            continue
+        if not _is_expired(row, now):
+            return row, False
+
+        # Take over the expired entry unless another retry already did
+        taken = IdempotencyKey.objects.filter(id=row.id, created_at=row.created_at).update(
+            fingerprint=fingerprint, status_code=None, response=None, created_at=now
+        )
+        if taken:
+            row.fingerprint, row.status_code, row.response, row.created_at = fingerprint, None, None, now
+            return row, True
+    return IdempotencyKey.objects.get(user=user, key=key_hash), False
+
+
+def idempotent(view):
+    """
+    Replay the stored response for a repeated Idempotency-Key.
+
+    The first request with a key claims it by inserting a pending
+    IdempotencyKey row, runs the view and stores its status code and body
+    for IDEMPOTENCY_KEY_TTL seconds. Keys live in the database, so a retry
+    that reaches another worker still finds them. Retries with the same key
+    and body get the stored response without running the view again; a
+    retry that arrives while the first request is still running gets 409,
+    and reusing a key with a different body gets 422. Server errors are
+    not stored, so the client may retry them. A pending claim older than
+    IDEMPOTENCY_PENDING_TIMEOUT is treated as abandoned. Requests without
+    the header are not affected.
+
+    Apply below @api_view so the view receives the DRF request.
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view(request, *args, **kwargs)
+
+        if len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            return Response({
+                'success': False,
+                'error': f'{IDEMPOTENCY_HEADER} must be at most {IDEMPOTENCY_KEY_MAX_LENGTH} characters'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        fingerprint = _fingerprint(request)
+        row, claimed = _claim(request.user, _key_hash(request, key), fingerprint)
+        if not claimed:
+            if row.fingerprint != fingerprint:
+                return Response({
+                    'success': False,
+                    'error': f'{IDEMPOTENCY_HEADER} was already used with a different request'
+                }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+            if row.status_code is None:
+                return Response({
+                    'success': False,
+                    'error': f'A request with this {IDEMPOTENCY_HEADER} is still in progress'
+                }, status=status.HTTP_409_CONFLICT)
+            response = Response(row.response, status=row.status_code)
+            response['Idempotent-Replayed'] = 'true'
+            return response
+
+        try:
+            response = view(request, *args, **kwargs)
+        except Exception:
+            IdempotencyKey.objects.filter(id=row.id).delete()
+            raise
+
+        if response.status_code >= 500:
+            IdempotencyKey.objects.filter(id=row.id).delete()
+        else:
+            IdempotencyKey.objects.filter(id=row.id).update(
+                status_code=response.status_code,
+                response=json.loads(json.dumps(response.data, default=str))
+            )
+        return response
+
+    return wrapper
+
+
+def prune_expired(now=None):
+    """Delete stored responses past IDEMPOTENCY_KEY_TTL, returning the count"""
+    now = now or timezone.now()
+    deleted, _ = IdempotencyKey.objects.filter(
+        created_at__lt=now - timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 86400))
+    ).delete()
+    return deleted
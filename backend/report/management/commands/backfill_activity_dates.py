@@ -0,0 +1,124 @@
+"""
+Management command to rewrite historical Activity.date values in each student's timezone
+
+Students are processed in batches. Each batch's activities are scanned in
+primary-key chunks and only rows whose local date differs are updated,
+each chunk in its own short transaction, so no long-running lock is held
+on the activities table. The daily rollups and stored streaks of the
+affected students are rebuilt after each batch. Activities already
+compacted into ActivitySummary keep their original dates.
+
+Usage:
+    python manage.py backfill_activity_dates
+    python manage.py backfill_activity_dates --student 12 --chunk-size 2000 --pause 0.1
+    python manage.py backfill_activity_dates --student-batch 200
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from report.models import Activity
+from report.services.ActivityService import ActivityService
+from report.services.StatsService import StatsService
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Rewrite Activity.date in each student's timezone and rebuild the affected rollups"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--student',
+            action='append',
+            type=int,
+            dest='student_ids',
+            help='Only backfill this student id (repeatable); default is every student not on UTC'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Activities scanned per transaction'
+        )
+        parser.add_argument(
+            '--student-batch',
+            type=int,
+            default=500,
+            help='Students scanned and rebuilt together'
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.0,
+            help='Seconds to sleep between chunks'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be at least 1')
+        if options['student_batch'] < 1:
+            raise CommandError('--student-batch must be at least 1')
+
+        students = User.objects.all()
+        if options['student_ids']:
+            students = students.filter(id__in=options['student_ids'])
+        else:
+            students = students.exclude(timezone='UTC')
+        tzinfos = {
+            student_id: User.get_tzinfo(name)
+            for student_id, name in students.values_list('id', 'timezone')
+        }
+        if not tzinfos:
+            self.stdout.write(self.style.SUCCESS('No students to backfill'))
+            return
+
+        self.stdout.write(f'Backfilling activity dates for {len(tzinfos)} students...')
+        student_ids = sorted(tzinfos)
+        batch_size = options['student_batch']
+        scanned = 0
+        updated = 0
+        affected_count = 0
+        for i in range(0, len(student_ids), batch_size):
+            batch = student_ids[i:i + batch_size]
+            affected = set()
+            last_id = 0
+            while True:
+                rows = list(
+                    Activity.objects.filter(
+                        student_id__in=batch,
+                        id__gt=last_id
+                    ).order_by('id').values_list('id', 'student_id', 'timestamp', 'date')[:chunk_size]
+                )
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                scanned += len(rows)
+
+                changed = []
+                for activity_id, student_id, timestamp, date in rows:
+                    local_date = timezone.localtime(timestamp, tzinfos[student_id]).date()
+                    if local_date != date:
+                        changed.append(Activity(id=activity_id, date=local_date))
+                        affected.add(student_id)
+
+                if changed:
+                    with transaction.atomic():
+                        Activity.objects.bulk_update(changed, ['date'], batch_size=1000)
+                    updated += len(changed)
+
+                self.stdout.write(f'  scanned {scanned} activities, updated {updated}')
+                if options['pause']:
+                    time.sleep(options['pause'])
+
+            if affected:
+                ActivityService.rebuild_daily_rollups(student_ids=sorted(affected))
+                StatsService.rebuild_streaks(student_ids=sorted(affected))
+                affected_count += len(affected)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated {updated} of {scanned} activities; rebuilt rollups for {affected_count} students'
+        ))
@@ -0,0 +1,31 @@
+"""
+Management command to backfill the stored learning streaks from Activity history
+
+Usage:
+    python manage.py backfill_streaks
+    python manage.py backfill_streaks --student 12 --student 15
+"""
+
+from django.core.management.base import BaseCommand
+
+from report.services.StatsService import StatsService
+
+
+class Command(BaseCommand):
+    help = 'Backfill current/longest learning streaks on StudentStats from Activity history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--student',
+            action='append',
+            type=int,
+            dest='student_ids',
+            help='Only backfill this student id (repeatable)'
+        )
+
+    def handle(self, *args, **options):
+        student_ids = options['student_ids']
+        
+        self.stdout.write('Backfilling learning streaks...')
+        count = StatsService.rebuild_streaks(student_ids=student_ids)
+        self.stdout.write(self.style.SUCCESS(f'Backfilled streaks for {count} students'))
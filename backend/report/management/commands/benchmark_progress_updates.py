@@ -0,0 +1,123 @@
+"""
+Management command to benchmark concurrent progress updates
+
+Fires the same number of time_spent updates at one (student, lesson) pair
+from several threads, once through the previous get_or_create + save path
+and once through ProgressService.update_progress, and reports throughput
+and how many minutes each path lost to concurrent writes.
+
+The benchmark writes to the selected progress row; run it against a
+scratch database.
+
+Usage:
+    python manage.py benchmark_progress_updates --student 12 --lesson 3
+    python manage.py benchmark_progress_updates --student 12 --lesson 3 --threads 16 --updates 50
+"""
+
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from courses.models import Lesson
+from report.models import Progress
+from report.services.ProgressService import ProgressService
+from report.services.StatsService import StatsService
+from users.models import User
+
+
+def _legacy_update(student, lesson_id, time_spent):
+    """The read-modify-write path update_progress used before the upsert"""
+    with transaction.atomic():
+        progress, created = Progress.objects.get_or_create(
+            student=student,
+            lesson_id=lesson_id,
+            defaults={'status': 'in_progress'}
+        )
+        progress.time_spent_minutes += time_spent
+        progress.last_accessed = timezone.now()
+        progress.save()
+
+
+def _upsert_update(student, lesson_id, time_spent):
+    result = ProgressService.update_progress(student, lesson_id, time_spent=time_spent)
+    if not result['success']:
+        raise RuntimeError(result['error'])
+
+
+class Command(BaseCommand):
+    help = 'Benchmark concurrent progress updates: legacy read-modify-write vs single-statement upsert'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--student', type=int, required=True, help='Student id to write progress for')
+        parser.add_argument('--lesson', type=int, required=True, help='Lesson id to write progress for')
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent writers (1 runs in-process)')
+        parser.add_argument('--updates', type=int, default=25, help='Updates per writer')
+
+    def handle(self, *args, **options):
+        try:
+            student = User.objects.get(id=options['student'], role='student')
+        except User.DoesNotExist:
+            raise CommandError(f"Student {options['student']} not found")
+        if not Lesson.objects.filter(id=options['lesson']).exists():
+            raise CommandError(f"Lesson {options['lesson']} not found")
+        if options['threads'] < 1 or options['updates'] < 1:
+            raise CommandError('--threads and --updates must be at least 1')
+
+        for name, update in (('legacy', _legacy_update), ('upsert', _upsert_update)):
+            self.run(name, update, student, options)
+
+        # The legacy path bypasses the denormalized stats
+        StatsService.rebuild(student_ids=[student.id])
+
+    def run(self, name, update, student, options):
+        """Run one path and print throughput and lost minutes"""
+        lesson_id = options['lesson']
+        threads = options['threads']
+        updates = options['updates']
+
+        before = self.time_spent(student, lesson_id)
+        errors = []
+
+        def writer():
+            try:
+                for _ in range(updates):
+                    update(student, lesson_id, 1)
+            except Exception as e:
+                errors.append(str(e))
+
+        def threaded_writer():
+            try:
+                writer()
+            finally:
+                # Each thread opened its own connection
+                connection.close()
+
+        started = time.perf_counter()
+        if threads == 1:
+            writer()
+        else:
+            workers = [threading.Thread(target=threaded_writer) for _ in range(threads)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        elapsed = max(time.perf_counter() - started, 1e-6)
+
+        expected = threads * updates
+        written = self.time_spent(student, lesson_id) - before
+        self.stdout.write(
+            f'{name}: {expected} updates in {elapsed:.2f}s '
+            f'({expected / elapsed:.1f} updates/s), '
+            f'{expected - written} of {expected} minutes lost'
+        )
+        for error in errors:
+            self.stdout.write(self.style.ERROR(f'  {name} writer failed: {error}'))
+
+    def time_spent(self, student, lesson_id):
+        return Progress.objects.filter(
+            student=student,
+            lesson_id=lesson_id
+        ).values_list('time_spent_minutes', flat=True).first() or 0
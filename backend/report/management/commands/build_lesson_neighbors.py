@@ -0,0 +1,55 @@
+"""
+Management command to rebuild the lesson co-completion neighbours
+
+Reads every completed Progress row, builds the sparse student x lesson
+matrix with NumPy/SciPy and stores the top-k most similar lessons per
+lesson in LessonNeighbor, which the "similar lessons" recommendation
+strategy reads. Run it offline (e.g. nightly) before
+generate_recommendations.
+
+Usage:
+    python manage.py build_lesson_neighbors
+    python manage.py build_lesson_neighbors --top-k 20 --min-support 5
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from report.services.CoCompletionService import CoCompletionService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild LessonNeighbor from lesson co-completions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top-k',
+            type=int,
+            default=10,
+            help='Neighbours kept per lesson'
+        )
+        parser.add_argument(
+            '--min-support',
+            type=int,
+            default=2,
+            help='Minimum number of students who completed both lessons'
+        )
+
+    def handle(self, *args, **options):
+        if options['top_k'] < 1:
+            raise CommandError('--top-k must be at least 1')
+        if options['min_support'] < 1:
+            raise CommandError('--min-support must be at least 1')
+
+        self.stdout.write('Building lesson co-completion neighbours...')
+        started = time.perf_counter()
+        result = CoCompletionService.build_neighbors(
+            top_k=options['top_k'],
+            min_support=options['min_support']
+        )
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored {result['neighbors']} neighbours for {result['lessons']} lessons in {elapsed:.1f}s"
+        ))
@@ -0,0 +1,72 @@
+"""
+Management command to compact old raw activities into daily summaries
+
+Activities dated before the retention horizon are folded into
+ActivitySummary (one row per student, lesson, day and event type) and
+deleted, a small chunk per transaction. The DailyActivity rollup already
+holds their totals, so dashboards are unaffected, and the rollup and
+streak rebuilds read the summaries alongside the remaining raw rows.
+When activities is partitioned on PostgreSQL, manage_activity_partitions
+--detach retires whole months more cheaply.
+
+Usage:
+    python manage.py compact_activities
+    python manage.py compact_activities --days 180 --chunk-size 500 --pause 0.05
+"""
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from report.services.ActivityService import ActivityService
+
+# get_recent_course_activity reads the last 7 days of raw activities
+MIN_RETENTION_DAYS = 8
+
+
+class Command(BaseCommand):
+    help = 'Compact raw activities older than the retention horizon into ActivitySummary'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.ACTIVITY_RETENTION_DAYS,
+            help='Keep raw activities for this many days (default: ACTIVITY_RETENTION_DAYS)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Activities compacted and deleted per transaction'
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.0,
+            help='Seconds to sleep between chunks'
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < MIN_RETENTION_DAYS:
+            raise CommandError(f'--days must be at least {MIN_RETENTION_DAYS}')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+
+        before_date = timezone.now().date() - timedelta(days=options['days'])
+        self.stdout.write(f'Compacting activities dated before {before_date}...')
+
+        total = 0
+        while True:
+            compacted = ActivityService.compact_activities(before_date, chunk_size=options['chunk_size'])
+            if not compacted:
+                break
+            total += compacted
+            self.stdout.write(f'  compacted {total} activities')
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(f'Compacted {total} activities'))
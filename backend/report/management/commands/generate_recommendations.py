@@ -0,0 +1,241 @@
+"""
+Management command to regenerate recommendations for every active student
+
+Students are split into chunks and processed by a pool of worker processes,
+each with its own database connection. Finished student ids are appended to
+a checkpoint file so an interrupted run can be resumed.
+
+Usage:
+    python manage.py generate_recommendations --workers 8 --chunk-size 200
+    python manage.py generate_recommendations --active-days 14
+    python manage.py generate_recommendations --checkpoint /tmp/recs.ckpt --resume
+"""
+
+import multiprocessing
+import os
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from users.models import User
+
+
+def _init_worker():
+    """Give every worker process a clean Django setup and its own connections"""
+    import django
+    django.setup()
+    connections.close_all()
+
+
+def _generate_chunk(args):
+    """Regenerate recommendations for one chunk of students (runs in a worker)"""
+    from report.services.RecommendationService import RecommendationService
+
+    student_ids, limit = args
+    results = []
+    students = User.objects.in_bulk(student_ids)
+    for student_id in student_ids:
+        student = students.get(student_id)
+        if student is None:
+            results.append((student_id, 0.0, False, 'Student not found', []))
+            continue
+
+        started = time.perf_counter()
+        result = RecommendationService.generate_recommendations(student, limit=limit)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        results.append((
+            student_id,
+            elapsed_ms,
+            result['success'],
+            result['count'] if result['success'] else result['error'],
+            result.get('strategies', [])
+        ))
+    return results
+
+
+class Command(BaseCommand):
+    help = 'Regenerate recommendations for all active students using a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Number of worker processes (1 runs in-process)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=100,
+            help='Students handed to a worker at a time'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=5,
+            help='Recommendations to keep per student'
+        )
+        parser.add_argument(
+            '--student',
+            action='append',
+            type=int,
+            dest='student_ids',
+            help='Only process this student id (repeatable)'
+        )
+        parser.add_argument(
+            '--active-days',
+            type=int,
+            help='Only process students with progress activity in the last N days'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='File that records finished student ids, one per line'
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Skip students already recorded in the checkpoint file'
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        chunk_size = options['chunk_size']
+        checkpoint = options['checkpoint']
+
+        if workers < 1 or chunk_size < 1:
+            raise CommandError('--workers and --chunk-size must be at least 1')
+        if options['resume'] and not checkpoint:
+            raise CommandError('--resume requires --checkpoint')
+
+        student_ids = self.get_student_ids(options)
+
+        if options['resume'] and os.path.exists(checkpoint):
+            with open(checkpoint) as f:
+                done = {int(line) for line in f if line.strip()}
+            student_ids = [student_id for student_id in student_ids if student_id not in done]
+            self.stdout.write(f'Resuming: {len(done)} students already done')
+
+        total = len(student_ids)
+        if total == 0:
+            self.stdout.write(self.style.SUCCESS('No students to process'))
+            return
+
+        chunks = [
+            (student_ids[i:i + chunk_size], options['limit'])
+            for i in range(0, total, chunk_size)
+        ]
+        self.stdout.write(
+            f'Generating recommendations for {total} students '
+            f'in {len(chunks)} chunks with {workers} workers...'
+        )
+
+        timings = []
+        failures = []
+        strategy_runs = defaultdict(list)
+        started = time.perf_counter()
+        checkpoint_file = open(checkpoint, 'a') if checkpoint else None
+
+        try:
+            for results in self.run_chunks(chunks, workers):
+                for student_id, elapsed_ms, success, detail, strategies in results:
+                    for entry in strategies:
+                        strategy_runs[entry['strategy']].append(entry)
+                    if success:
+                        timings.append(elapsed_ms)
+                        if checkpoint_file:
+                            checkpoint_file.write(f'{student_id}\n')
+                    else:
+                        failures.append((student_id, detail))
+                if checkpoint_file:
+                    checkpoint_file.flush()
+
+                processed = len(timings) + len(failures)
+                elapsed = max(time.perf_counter() - started, 1e-6)
+                self.stdout.write(
+                    f'  {processed}/{total} students '
+                    f'({processed / elapsed:.1f} students/s)'
+                )
+        finally:
+            if checkpoint_file:
+                checkpoint_file.close()
+
+        self.report(timings, failures, time.perf_counter() - started)
+        self.report_strategies(strategy_runs)
+
+    def get_student_ids(self, options):
+        """Active students to process, ordered by id"""
+        students = User.objects.filter(role='student', is_active=True)
+        if options['student_ids']:
+            students = students.filter(id__in=options['student_ids'])
+        if options['active_days'] is not None:
+            since = timezone.now() - timedelta(days=options['active_days'])
+            students = students.filter(stats__last_activity__gte=since)
+        return list(students.order_by('id').values_list('id', flat=True))
+
+    def run_chunks(self, chunks, workers):
+        """Yield per-chunk results, in-process or from a worker pool"""
+        if workers == 1:
+            for chunk in chunks:
+                yield _generate_chunk(chunk)
+            return
+
+        # Never share the parent's connections with forked workers
+        connections.close_all()
+        with multiprocessing.Pool(processes=workers, initializer=_init_worker) as pool:
+            yield from pool.imap_unordered(_generate_chunk, chunks)
+
+    def report(self, timings, failures, elapsed):
+        """Print throughput and per-student timing"""
+        processed = len(timings) + len(failures)
+        elapsed = max(elapsed, 1e-6)
+        self.stdout.write(
+            f'Processed {processed} students in {elapsed:.2f}s '
+            f'({processed / elapsed:.1f} students/s)'
+        )
+
+        if timings:
+            timings.sort()
+            p50 = timings[len(timings) // 2]
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            self.stdout.write(
+                f'Per-student time: p50 {p50:.1f}ms, p95 {p95:.1f}ms, max {timings[-1]:.1f}ms'
+            )
+
+        for student_id, error in failures:
+            self.stdout.write(self.style.ERROR(f'Student {student_id} failed: {error}'))
+
+        if failures:
+            self.stdout.write(self.style.WARNING(
+                f'{len(failures)} students failed; rerun with --resume to retry them'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS('Successfully generated recommendations'))
+
+    def report_strategies(self, strategy_runs):
+        """Print per-strategy timing, query counts and skips"""
+        if not strategy_runs:
+            return
+
+        self.stdout.write('Per-strategy cost:')
+        for name, entries in strategy_runs.items():
+            timings = sorted(entry['ms'] for entry in entries)
+            p50 = timings[len(timings) // 2]
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            queries = sum(entry['queries'] for entry in entries) / len(entries)
+            line = (
+                f'  {name}: {len(entries)} runs, p50 {p50:.2f}ms, p95 {p95:.2f}ms, '
+                f'max {timings[-1]:.2f}ms, {queries:.1f} queries/run'
+            )
+            skipped = {
+                status: sum(entry['status'] == status for entry in entries)
+                for status in ('disabled', 'over_budget', 'failed')
+            }
+            skipped = ', '.join(f'{count} {status}' for status, count in skipped.items() if count)
+            if skipped:
+                self.stdout.write(self.style.WARNING(f'{line} ({skipped})'))
+            else:
+                self.stdout.write(line)
@@ -0,0 +1,152 @@
+"""
+Management command to partition the activities table and maintain its monthly partitions
+
+--partition converts the plain table into one range-partitioned by month
+of "date" and --unpartition converts it back (PostgreSQL only). The table
+is swapped in one short transaction and the rows are then moved over in
+chunks of --chunk-size, newest first, each in its own transaction; rerun
+the same option to resume an interrupted conversion.
+
+On a partitioned table the command creates the partitions for the coming
+months ahead of time and, with --detach, retires the months that are past
+the retention horizon: their rows are summarized into ActivitySummary and
+the partition is detached (and dropped with --drop) instead of being
+deleted row by row.
+
+Usage:
+    python manage.py manage_activity_partitions --partition --chunk-size 5000 --pause 0.1
+    python manage.py manage_activity_partitions
+    python manage.py manage_activity_partitions --months-ahead 6
+    python manage.py manage_activity_partitions --detach --days 180 --drop
+    python manage.py manage_activity_partitions --unpartition
+"""
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from report import partitioning
+from report.services.ActivityService import ActivityService
+
+# get_recent_course_activity reads the last 7 days of raw activities
+MIN_RETENTION_DAYS = 8
+
+
+class Command(BaseCommand):
+    help = 'Partition the activities table by month, create upcoming partitions and detach old ones'
+
+    def add_arguments(self, parser):
+        conversion = parser.add_mutually_exclusive_group()
+        conversion.add_argument(
+            '--partition',
+            action='store_true',
+            help='Convert activities into a table partitioned by month of date'
+        )
+        conversion.add_argument(
+            '--unpartition',
+            action='store_true',
+            help='Convert a partitioned activities table back into a plain table'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Rows moved per transaction during a conversion'
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.0,
+            help='Seconds to sleep between conversion chunks'
+        )
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=settings.ACTIVITY_PARTITION_MONTHS_AHEAD,
+            help='Create partitions through this many months from now (default: ACTIVITY_PARTITION_MONTHS_AHEAD)'
+        )
+        parser.add_argument(
+            '--detach',
+            action='store_true',
+            help='Summarize and detach the months older than --days'
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.ACTIVITY_RETENTION_DAYS,
+            help='Keep raw activities for this many days (default: ACTIVITY_RETENTION_DAYS)'
+        )
+        parser.add_argument(
+            '--drop',
+            action='store_true',
+            help='Drop detached partitions instead of keeping them as standalone tables'
+        )
+
+    def handle(self, *args, **options):
+        if options['partition'] or options['unpartition']:
+            self.convert(options)
+            return
+
+        if partitioning.conversion_pending():
+            raise CommandError('A conversion is in progress; rerun it with --partition or --unpartition')
+        if not partitioning.is_partitioned():
+            raise CommandError('The activities table is not partitioned; run --partition first (PostgreSQL only)')
+        if options['months_ahead'] < 0:
+            raise CommandError('--months-ahead must not be negative')
+        if options['days'] < MIN_RETENTION_DAYS:
+            raise CommandError(f'--days must be at least {MIN_RETENTION_DAYS}')
+
+        created = partitioning.ensure_partitions(months_ahead=options['months_ahead'])
+        for name in created:
+            self.stdout.write(f'  created {name}')
+
+        detached = []
+        if options['detach']:
+            before_date = timezone.now().date() - timedelta(days=options['days'])
+            detached = ActivityService.detach_activity_partitions(before_date, drop=options['drop'])
+            action = 'dropped' if options['drop'] else 'detached'
+            for name in detached:
+                self.stdout.write(f'  {action} {name}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(created)} partitions; retired {len(detached)}'
+        ))
+
+    def convert(self, options):
+        """Run or resume a conversion to (--partition) or from (--unpartition) a partitioned table"""
+        if connection.vendor != 'postgresql':
+            raise CommandError('Partitioning the activities table requires PostgreSQL')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+
+        partitioned = options['partition']
+        if not partitioning.conversion_pending():
+            if partitioning.is_partitioned() == partitioned:
+                self.stdout.write(self.style.SUCCESS('Nothing to convert'))
+                return
+            with transaction.atomic():
+                partitioning.start_conversion(partitioned=partitioned, months_ahead=options['months_ahead'])
+            self.stdout.write('Swapped in the new activities table; moving rows...')
+        elif partitioning.is_partitioned() != partitioned:
+            option = '--unpartition' if partitioned else '--partition'
+            raise CommandError(f'A conversion in the other direction is in progress; rerun it with {option}')
+
+        moved = 0
+        while True:
+            with transaction.atomic():
+                count = partitioning.copy_rows(chunk_size=options['chunk_size'])
+            if not count:
+                break
+            moved += count
+            self.stdout.write(f'  moved {moved} activities')
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        with transaction.atomic():
+            partitioning.finish_conversion()
+        kind = 'partitioned' if partitioned else 'plain'
+        self.stdout.write(self.style.SUCCESS(f'Moved {moved} activities into the {kind} table'))
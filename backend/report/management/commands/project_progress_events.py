@@ -0,0 +1,102 @@
+"""
+Management command to fold the progress event log into Progress and its aggregates
+
+Runs as a long-lived loop next to the web processes when
+PROGRESS_WRITE_MODE is 'events'.
+
+Usage:
+    python manage.py project_progress_events
+    python manage.py project_progress_events --batch-size 1000 --interval 0.5
+    python manage.py project_progress_events --once --prune-days 30
+    python manage.py project_progress_events --once --retry-parked
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from report.services.ProgressEventService import ProgressEventService
+
+
+class Command(BaseCommand):
+    help = 'Project ProgressEvent rows into Progress, Activity and the student aggregates'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Events folded per transaction'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Seconds to sleep when there is nothing to project'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the backlog once and exit'
+        )
+        parser.add_argument(
+            '--retry-parked',
+            action='store_true',
+            help='First apply the events parked by earlier failures again'
+        )
+        parser.add_argument(
+            '--prune-days',
+            type=int,
+            help='Also delete projected events older than N days'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        if options['retry_parked']:
+            self.retry_parked(batch_size)
+
+        self.stdout.write(f'Projecting progress events ({ProgressEventService.backlog()} pending)...')
+        processed = 0
+        try:
+            while True:
+                result = ProgressEventService.project_batch(batch_size=batch_size)
+                if not result['success']:
+                    self.stdout.write(self.style.ERROR(f"Projection failed: {result['error']}"))
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+                    continue
+
+                processed += result['processed']
+                if result['failed']:
+                    self.stdout.write(self.style.WARNING(
+                        f"  {result['failed']} events could not be projected and were parked"
+                    ))
+
+                if result['processed'] < batch_size:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        if options['prune_days'] is not None:
+            deleted = ProgressEventService.prune(options['prune_days'])
+            self.stdout.write(f'Pruned {deleted} projected events')
+
+        self.stdout.write(self.style.SUCCESS(f'Projected {processed} events'))
+
+    def retry_parked(self, batch_size):
+        self.stdout.write(f'Retrying parked events ({ProgressEventService.parked_count()} parked)...')
+        recovered = 0
+        last_id = 0
+        while last_id is not None:
+            result = ProgressEventService.retry_parked(batch_size=batch_size, after_id=last_id)
+            if not result['success']:
+                raise CommandError(f"Retry failed: {result['error']}")
+            recovered += result['processed']
+            last_id = result['last_id']
+        self.stdout.write(f'  {recovered} parked events applied, {ProgressEventService.parked_count()} still parked')
@@ -0,0 +1,18 @@
+"""
+Management command to delete stored Idempotency-Key responses past IDEMPOTENCY_KEY_TTL
+
+Usage:
+    python manage.py prune_idempotency_keys
+"""
+
+from django.core.management.base import BaseCommand
+
+from report.idempotency import prune_expired
+
+
+class Command(BaseCommand):
+    help = 'Delete stored Idempotency-Key responses older than IDEMPOTENCY_KEY_TTL'
+
+    def handle(self, *args, **options):
+        deleted = prune_expired()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired idempotency keys'))
@@ -0,0 +1,52 @@
+"""
+Management command to rebuild the CourseProgress next-lesson pointers from Progress
+
+Run it after editing lessons outside LessonService (admin edits,
+reordering, deletions) so the stored pointers follow the new order.
+
+Usage:
+    python manage.py rebuild_course_progress
+    python manage.py rebuild_course_progress --course 3 --student 12 --chunk-size 200
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from report.services.CourseProgressService import CourseProgressService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the CourseProgress next-lesson pointers from Progress'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--student',
+            action='append',
+            type=int,
+            dest='student_ids',
+            help='Only rebuild this student id (repeatable)'
+        )
+        parser.add_argument(
+            '--course',
+            action='append',
+            type=int,
+            dest='course_ids',
+            help='Only rebuild this course id (repeatable)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Students recomputed per transaction'
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+
+        self.stdout.write('Rebuilding course progress pointers...')
+        count = CourseProgressService.rebuild(
+            student_ids=options['student_ids'],
+            course_ids=options['course_ids'],
+            chunk_size=options['chunk_size']
+        )
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} course progress rows'))
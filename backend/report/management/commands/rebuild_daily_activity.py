@@ -0,0 +1,31 @@
+"""
+Management command to rebuild the DailyActivity rollup from raw activities
+
+Usage:
+    python manage.py rebuild_daily_activity
+    python manage.py rebuild_daily_activity --student 12 --student 15
+"""
+
+from django.core.management.base import BaseCommand
+
+from report.services.ActivityService import ActivityService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the DailyActivity rollup from raw activities'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--student',
+            action='append',
+            type=int,
+            dest='student_ids',
+            help='Only rebuild this student id (repeatable)'
+        )
+
+    def handle(self, *args, **options):
+        student_ids = options['student_ids']
+        
+        self.stdout.write('Rebuilding daily activity rollups...')
+        count = ActivityService.rebuild_daily_rollups(student_ids=student_ids)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} daily activity rows'))
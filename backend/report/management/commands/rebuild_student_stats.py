@@ -0,0 +1,31 @@
+"""
+Management command to rebuild the denormalized StudentStats table from Progress
+
+Usage:
+    python manage.py rebuild_student_stats
+    python manage.py rebuild_student_stats --student 12 --student 15
+"""
+
+from django.core.management.base import BaseCommand
+
+from report.services.StatsService import StatsService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized StudentStats table from Progress'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--student',
+            action='append',
+            type=int,
+            dest='student_ids',
+            help='Only rebuild this student id (repeatable)'
+        )
+
+    def handle(self, *args, **options):
+        student_ids = options['student_ids']
+        
+        self.stdout.write('Rebuilding student stats...')
+        count = StatsService.rebuild(student_ids=student_ids)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {count} students'))
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.26 on 2026-10-17 02:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('report', '0005_studentstats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studentstats',
+            index=models.Index(fields=['completed', 'student'], name='student_sta_complet_342a7c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentstats',
+            index=models.Index(fields=['total_time_minutes', 'student'], name='student_sta_total_t_8643dd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentstats',
+            index=models.Index(fields=['last_activity', 'student'], name='student_sta_last_ac_e10908_idx'),
+        ),
+    ]
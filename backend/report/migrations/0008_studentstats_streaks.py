@@ -0,0 +1,28 @@
+# Generated by Django 4.2.26 on 2026-10-17 02:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('report', '0007_dailyactivity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentstats',
+            name='current_streak',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='studentstats',
+            name='last_active_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='studentstats',
+            name='longest_streak',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.26 on 2026-10-17 02:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('report', '0008_studentstats_streaks'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='activity',
+            name='event_type',
+            field=models.CharField(choices=[('lesson_start', 'Lesson Start'), ('lesson_complete', 'Lesson Complete'), ('session_start', 'Session Start'), ('session_end', 'Session End'), ('heartbeat', 'Heartbeat')], db_index=True, max_length=20),
+        ),
+    ]
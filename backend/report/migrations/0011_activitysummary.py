@@ -0,0 +1,35 @@
+# Generated by Django 4.2.26 on 2026-10-17 03:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0002_lesson_lessons_course__eb1bdb_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('report', '0010_progressevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivitySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('event_type', models.CharField(choices=[('lesson_start', 'Lesson Start'), ('lesson_complete', 'Lesson Complete'), ('session_start', 'Session Start'), ('session_end', 'Session End'), ('heartbeat', 'Heartbeat')], max_length=20)),
+                ('minutes', models.PositiveIntegerField(default=0)),
+                ('events', models.PositiveIntegerField(default=0)),
+                ('lesson', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='activity_summaries', to='courses.lesson')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'activity_summaries',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['student', 'date'], name='activity_su_student_e1583c_idx')],
+                'unique_together': {('student', 'lesson', 'date', 'event_type')},
+            },
+        ),
+    ]
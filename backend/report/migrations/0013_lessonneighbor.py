@@ -0,0 +1,30 @@
+# Generated by Django 4.2.26 on 2026-10-17 03:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0002_lesson_lessons_course__eb1bdb_idx'),
+        ('report', '0011_activitysummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LessonNeighbor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('students', models.PositiveIntegerField()),
+                ('lesson', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbors', to='courses.lesson')),
+                ('neighbor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='courses.lesson')),
+            ],
+            options={
+                'db_table': 'lesson_neighbors',
+                'indexes': [models.Index(fields=['lesson', '-score'], name='lesson_neig_lesson__946eb3_idx')],
+                'unique_together': {('lesson', 'neighbor')},
+            },
+        ),
+    ]
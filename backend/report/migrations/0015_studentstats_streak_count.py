@@ -0,0 +1,58 @@
+# Generated by Django 4.2.26 on 2026-10-17 03:49
+
+from django.db import migrations, models
+
+# Frozen copy of StatsService.STREAK_MAX_GAP_DAYS
+STREAK_MAX_GAP_DAYS = 2
+
+
+def backfill_streak_counts(apps, schema_editor):
+    """
+    Count the streaks of existing students from their raw and compacted
+    activity days, as StatsService.rebuild_streaks does, so sort=count is
+    right without a manual backfill_streaks run
+    """
+    Activity = apps.get_model('report', 'Activity')
+    ActivitySummary = apps.get_model('report', 'ActivitySummary')
+    StudentStats = apps.get_model('report', 'StudentStats')
+
+    days = Activity.objects.order_by().values_list('student_id', 'date').union(
+        ActivitySummary.objects.order_by().values_list('student_id', 'date')
+    ).order_by('student_id', 'date')
+    counts = {}
+    last_dates = {}
+    for student_id, date in days.iterator(chunk_size=2000):
+        last = last_dates.get(student_id)
+        if last is None or (date - last).days > STREAK_MAX_GAP_DAYS:
+            counts[student_id] = counts.get(student_id, 0) + 1
+        last_dates[student_id] = date
+
+    StudentStats.objects.bulk_update(
+        [StudentStats(student_id=student_id, streak_count=count) for student_id, count in counts.items()],
+        ['streak_count'],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('report', '0014_courseprogress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentstats',
+            name='streak_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='studentstats',
+            index=models.Index(fields=['-longest_streak', 'student'], name='student_sta_longest_06e58e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentstats',
+            index=models.Index(fields=['-streak_count', 'student'], name='student_sta_streak__72a167_idx'),
+        ),
+        migrations.RunPython(backfill_streak_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.26 on 2026-10-17 04:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('report', '0015_studentstats_streak_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='progressevent',
+            name='error',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='progressevent',
+            name='failed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
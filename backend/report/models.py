@@ -1,7 +1,7 @@
 from django.db import models
 from django.utils import timezone
 from users.models import User
-from courses.models import Lesson
+from courses.models import Course, Lesson
 
 
 class Progress(models.Model):
@@ -53,6 +53,7 @@ class Activity(models.Model):
         ('lesson_complete', 'Lesson Complete'),
         ('session_start', 'Session Start'),
         ('session_end', 'Session End'),
+        ('heartbeat', 'Heartbeat'),
     ]
     
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='activities')
@@ -65,10 +66,12 @@ class Activity(models.Model):
     class Meta:
         db_table = 'activities'
         ordering = ['-timestamp']
+        # On PostgreSQL the table can be range-partitioned by month of date
+        # (manage_activity_partitions --partition); filter on date to prune partitions
 
         indexes = [
             # Reason: filter Activity.objects.filter(student=student, date__gte=start_date)
-            # Used in: get_daily_time_series (30-day chart), get_learning_streak
+            # Used in: get_daily_time_series (30-day chart), StatsService streak backfill
             models.Index(fields=['student', 'date']),
             
             # Reason: filter Activity.objects.filter(student=student, timestamp__gte=...)
@@ -80,6 +83,25 @@ class Activity(models.Model):
         return f"{self.student.email} - {self.event_type}"
 
 
+class DailyActivity(models.Model):
+    """Per-student daily activity rollup, kept current by ActivityService"""
+    
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_activity')
+    date = models.DateField()
+    minutes = models.PositiveIntegerField(default=0)
+    sessions = models.PositiveIntegerField(default=0)
+    lessons_completed = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'daily_activity'
+        ordering = ['-date']
+        # Reason: range scans DailyActivity.objects.filter(student=student, date__gte=...)
+        # Used in: get_daily_time_series, rollup upserts
+        unique_together = [['student', 'date']]
+    
+    def __str__(self):
+        return f"{self.student.email} - {self.date}"
+
 
 class Recommendation(models.Model):
     student = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -96,4 +118,158 @@ class Recommendation(models.Model):
             models.Index(fields=['student', 'is_dismissed']),
         ]
          
-        ordering = ['-priority', '-created_at']
\ No newline at end of file
+        ordering = ['-priority', '-created_at']
+
+
+class LessonNeighbor(models.Model):
+    """Top co-completed lessons per lesson, rebuilt offline by build_lesson_neighbors"""
+    
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='neighbors')
+    neighbor = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()  # Cosine similarity of the completion vectors
+    students = models.PositiveIntegerField()  # Students who completed both
+    
+    class Meta:
+        db_table = 'lesson_neighbors'
+        unique_together = [['lesson', 'neighbor']]
+        indexes = [
+            # Reason: filter LessonNeighbor.objects.filter(lesson_id__in=...) ORDER BY score
+            # Used in: SimilarLessonsStrategy (RecommendationStrategies)
+            models.Index(fields=['lesson', '-score']),
+        ]
+    
+    def __str__(self):
+        return f"{self.lesson_id} -> {self.neighbor_id} ({self.score:.2f})"
+
+
+class ActivitySummary(models.Model):
+    """Compacted raw activities: one row per student, lesson, day and event type"""
+    
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='activity_summaries')
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='activity_summaries', null=True, blank=True)
+    date = models.DateField()
+    event_type = models.CharField(max_length=20, choices=Activity.EVENT_TYPE_CHOICES)
+    minutes = models.PositiveIntegerField(default=0)
+    events = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'activity_summaries'
+        ordering = ['-date']
+        unique_together = [['student', 'lesson', 'date', 'event_type']]
+        indexes = [
+            # Reason: filter ActivitySummary.objects.filter(student_id__in=..., date__in=...)
+            # Used in: ActivityService.compact_activities merge, rollup and streak rebuilds
+            models.Index(fields=['student', 'date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.student_id} - {self.date} - {self.event_type} x{self.events}"
+
+
+class StudentStats(models.Model):
+    """Denormalized per-student progress totals, kept current by ProgressService"""
+    
+    student = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    completed = models.PositiveIntegerField(default=0)
+    in_progress = models.PositiveIntegerField(default=0)
+    total_time_minutes = models.PositiveIntegerField(default=0)
+    courses_touched = models.PositiveIntegerField(default=0)
+    last_activity = models.DateTimeField(null=True, blank=True)
+    current_streak = models.PositiveIntegerField(default=0)
+    longest_streak = models.PositiveIntegerField(default=0)
+    streak_count = models.PositiveIntegerField(default=0)
+    last_active_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'student_stats'
+        indexes = [
+            # Reason: keyset pagination ORDER BY <column>, student_id
+            # Used in: DashboardService.get_mentor_dashboard_data (sort=progress|time_spent|last_activity)
+            models.Index(fields=['completed', 'student']),
+            models.Index(fields=['total_time_minutes', 'student']),
+            models.Index(fields=['last_activity', 'student']),
+            # Reason: top-N ORDER BY <streak column> DESC, student_id LIMIT n
+            # Used in: DashboardService.get_streak_ranking (sort=longest|count)
+            models.Index(fields=['-longest_streak', 'student']),
+            models.Index(fields=['-streak_count', 'student']),
+        ]
+    
+    def __str__(self):
+        return f"{self.student.email} - {self.completed} completed"
+
+
+class CourseProgress(models.Model):
+    """Per-student, per-course next unfinished lesson, kept current by CourseProgressService"""
+    
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='course_progress')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='student_progress')
+    next_lesson = models.ForeignKey(Lesson, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')  # None once every lesson is completed, or after the lesson was deleted
+    completed = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'course_progress'
+        # Reason: single-row reads CourseProgress.objects.filter(student=student, course_id=...)
+        # Used in: CourseProgressService.get_next_lesson, upserts
+        unique_together = [['student', 'course']]
+    
+    def __str__(self):
+        return f"{self.student_id} - {self.course_id} -> {self.next_lesson_id}"
+
+
+class ProgressEvent(models.Model):
+    """Append-only log of progress writes, folded into Progress by the projector"""
+    
+    STATUS_CHOICES = Progress.STATUS_CHOICES
+    
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='progress_events')
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='progress_events')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, null=True, blank=True)
+    time_spent = models.PositiveIntegerField(null=True, blank=True)
+    notes = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    # Set when the projector could not apply the event and parked it
+    failed_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'progress_events'
+        ordering = ['id']
+    
+    def __str__(self):
+        return f"{self.student_id} - {self.lesson_id} - {self.status or 'time'}"
+
+
+class ProjectorCheckpoint(models.Model):
+    """Last event id a projector has folded into the read models"""
+    
+    name = models.CharField(max_length=50, primary_key=True)
+    last_event_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'projector_checkpoints'
+    
+    def __str__(self):
+        return f"{self.name} @ {self.last_event_id}"
+
+
+class IdempotencyKey(models.Model):
+    """Stored response of a write request sent with an Idempotency-Key, shared by every worker"""
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    key = models.CharField(max_length=64)  # sha256 of the request path and the header value
+    fingerprint = models.CharField(max_length=32)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)  # None while the first request runs
+    response = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    
+    class Meta:
+        db_table = 'idempotency_keys'
+        # Reason: claim and lookup IdempotencyKey.objects.filter(user=user, key=...)
+        # Used in: report.idempotency.idempotent
+        unique_together = [['user', 'key']]
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.key[:12]} ({self.status_code or 'pending'})"
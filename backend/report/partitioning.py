@@ -0,0 +1,213 @@
+"""
+report/partitioning.py - Monthly range partitioning of the activities table (PostgreSQL only)
+
+Partitioning is opt-in: `manage_activity_partitions --partition` converts
+the table and `--unpartition` converts it back. The table is partitioned
+by month of the "date" column, the column the activity queries and the
+compaction horizon filter on, so the planner can skip whole months.
+Partitions are named activities_pYYYY_MM, plus an activities_default
+partition that catches rows outside every monthly range so inserts never
+fail. PostgreSQL requires the partition key in the primary key, so the
+database key is (id, date); ids still come from a single sequence and
+stay unique, which is all the ORM relies on.
+
+A conversion swaps in an empty table of the new kind in one short
+transaction (start_conversion), moves the rows over from activities_old
+in small chunks, newest first (copy_rows), and drops the old table
+(finish_conversion). New writes go to the new table from the start, and
+an interrupted conversion resumes where it stopped.
+
+These helpers take a connection and only issue SQL; callers own the
+transactions.
+"""
+import re
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.db import connection as default_connection
+
+TABLE = 'activities'
+OLD_TABLE = f'{TABLE}_old'
+PARTITION_KEY = 'date'
+DEFAULT_PARTITION = f'{TABLE}_default'
+ID_SEQUENCE = f'{TABLE}_row_id_seq'
+DEFAULT_MONTHS_AHEAD = 3
+
+_PARTITION_NAME = re.compile(rf'^{TABLE}_p(\d{{4}})_(\d{{2}})$')
+
+
+def add_months(month_start, months):
+    """First day of the month `months` after `month_start`"""
+    index = month_start.year * 12 + month_start.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month_start):
+    return f'{TABLE}_p{month_start.year:04d}_{month_start.month:02d}'
+
+
+def is_partitioned(connection=default_connection):
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)',
+            [TABLE]
+        )
+        return cursor.fetchone() is not None
+
+
+def conversion_pending(connection=default_connection):
+    """True while a started conversion still has rows in activities_old"""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT to_regclass(%s)', [OLD_TABLE])
+        return cursor.fetchone()[0] is not None
+
+
+def monthly_partitions(connection=default_connection):
+    """[(partition name, first day of its month)] for the attached monthly partitions, oldest first"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+            'WHERE i.inhparent = to_regclass(%s)',
+            [TABLE]
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = []
+    for name in names:
+        match = _PARTITION_NAME.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def ensure_partitions(connection=default_connection, months_ahead=DEFAULT_MONTHS_AHEAD, start=None):
+    """
+    Create the monthly partitions from `start` (default: this month)
+    through `months_ahead` months from now. Rows already caught by the
+    default partition for a new month are moved into it. Returns the names
+    of the partitions created.
+    """
+    today = datetime.now(dt_timezone.utc).date()
+    month = (start or today).replace(day=1)
+    last = add_months(today.replace(day=1), months_ahead)
+    existing = {name for name, _ in monthly_partitions(connection)}
+
+    created = []
+    with connection.cursor() as cursor:
+        while month <= last:
+            name = partition_name(month)
+            if name not in existing:
+                lower, upper = month.isoformat(), add_months(month, 1).isoformat()
+                # Attaching validates the default partition too, so move any
+                # rows it holds for this month first
+                cursor.execute(
+                    f'CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+                )
+                cursor.execute(
+                    f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} '
+                    f'WHERE "{PARTITION_KEY}" >= %s AND "{PARTITION_KEY}" < %s RETURNING *) '
+                    f'INSERT INTO {name} SELECT * FROM moved',
+                    [lower, upper]
+                )
+                cursor.execute(
+                    f'ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)',
+                    [lower, upper]
+                )
+                created.append(name)
+            month = add_months(month, 1)
+    return created
+
+
+def detach_partition(name, drop=False, connection=default_connection):
+    with connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {name}')
+        if drop:
+            cursor.execute(f'DROP TABLE {name}')
+
+
+def start_conversion(connection=default_connection, partitioned=True, months_ahead=DEFAULT_MONTHS_AHEAD):
+    """
+    Rename activities to activities_old and create an empty activities
+    table of the requested kind with the same columns, keys, indexes and
+    foreign keys. The old indexes and constraints are renamed with an
+    _old suffix so the new ones keep their names. With `partitioned`,
+    monthly partitions are created from the oldest row's month.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {OLD_TABLE}')
+        cursor.execute(
+            "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(%s) AND contype IN ('p', 'f')",
+            [OLD_TABLE]
+        )
+        constraints = cursor.fetchall()
+        pk_name = next(name for name, kind, _ in constraints if kind == 'p')
+        foreign_keys = [(name, definition) for name, kind, definition in constraints if kind == 'f']
+        cursor.execute(
+            'SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s AND indexname <> %s',
+            [OLD_TABLE, pk_name]
+        )
+        indexes = [
+            (name, re.sub(rf' ON (?:ONLY )?(?:\S+\.)?{OLD_TABLE} ', f' ON {TABLE} ', definition))
+            for name, definition in cursor.fetchall()
+        ]
+
+        # Renaming the primary key's index renames the constraint as well
+        for name, _ in indexes:
+            cursor.execute(f'ALTER INDEX {name} RENAME TO {name}_old')
+        cursor.execute(f'ALTER INDEX {pk_name} RENAME TO {pk_name}_old')
+        for name, _ in foreign_keys:
+            cursor.execute(f'ALTER TABLE {OLD_TABLE} RENAME CONSTRAINT {name} TO {name}_old')
+
+        clause = f' PARTITION BY RANGE ("{PARTITION_KEY}")' if partitioned else ''
+        cursor.execute(
+            f'CREATE TABLE {TABLE} (LIKE {OLD_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS){clause}'
+        )
+        # Identity columns cannot be copied to a partitioned table, so ids
+        # come from a plain sequence owned by the new table
+        cursor.execute(f'CREATE SEQUENCE IF NOT EXISTS {ID_SEQUENCE}')
+        cursor.execute(
+            f"SELECT setval('{ID_SEQUENCE}', COALESCE((SELECT MAX(id) FROM {OLD_TABLE}), 0) + 1, false)"
+        )
+        cursor.execute(f"ALTER TABLE {TABLE} ALTER COLUMN id SET DEFAULT nextval('{ID_SEQUENCE}')")
+        cursor.execute(f'ALTER SEQUENCE {ID_SEQUENCE} OWNED BY {TABLE}.id')
+
+        key = f'id, "{PARTITION_KEY}"' if partitioned else 'id'
+        cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {pk_name} PRIMARY KEY ({key})')
+        for _, definition in indexes:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}')
+
+        if partitioned:
+            cursor.execute(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT')
+            cursor.execute(f'SELECT MIN("{PARTITION_KEY}") FROM {OLD_TABLE}')
+            oldest = cursor.fetchone()[0]
+            ensure_partitions(connection, months_ahead=months_ahead, start=oldest)
+
+
+def copy_rows(connection=default_connection, chunk_size=5000):
+    """
+    Move up to `chunk_size` of the newest rows from activities_old into
+    activities. Returns the number of rows moved (0 once it is empty).
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {OLD_TABLE} WHERE id IN '
+            f'(SELECT id FROM {OLD_TABLE} ORDER BY id DESC LIMIT %s) RETURNING *) '
+            f'INSERT INTO {TABLE} SELECT * FROM moved',
+            [chunk_size]
+        )
+        return cursor.rowcount
+
+
+def finish_conversion(connection=default_connection):
+    """Drop the emptied activities_old table (and its partitions)"""
+    with connection.cursor() as cursor:
+        # Fire deferred foreign key checks of rows moved in this transaction
+        # first; PostgreSQL refuses to drop a table with pending trigger events
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        cursor.execute(f'DROP TABLE {OLD_TABLE}')
@@ -1,6 +1,10 @@
 """
 progress/serializers.py - Progress serializers
 """
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
 from .models import Progress, Activity
 
@@ -26,10 +30,45 @@ class UpdateProgressSerializer(serializers.Serializer):
     notes = serializers.CharField(required=False, allow_blank=True)
 
 
+class HeartbeatSerializer(serializers.Serializer):
+    """Serializer for lesson player heartbeats"""
+    
+    lesson_id = serializers.IntegerField(required=True)
+    seconds = serializers.IntegerField(required=True, min_value=1, max_value=300)
+
+
 class ActivitySerializer(serializers.ModelSerializer):
     """Activity serializer"""
     
     class Meta:
         model = Activity
         fields = ['id', 'student', 'lesson', 'event_type', 'duration_minutes', 'timestamp', 'date']
-        read_only_fields = ['id', 'student', 'timestamp', 'date']
\ No newline at end of file
+        read_only_fields = ['id', 'student', 'timestamp', 'date']
+
+
+class ActivityBatchItemSerializer(ActivitySerializer):
+    """
+    Serializer for one client-reported activity in a batch
+    The lesson is taken as a plain id so a batch is checked against the
+    lessons table in one query instead of one lookup per item.
+    """
+    
+    CLIENT_EVENT_TYPES = ['lesson_start', 'session_start', 'session_end']
+    
+    lesson = serializers.IntegerField(source='lesson_id', required=False, allow_null=True)
+    event_type = serializers.ChoiceField(choices=CLIENT_EVENT_TYPES)
+    duration_minutes = serializers.IntegerField(required=False, min_value=0, max_value=24 * 60, default=0)
+    timestamp = serializers.DateTimeField()
+    
+    class Meta(ActivitySerializer.Meta):
+        read_only_fields = ['id', 'student', 'date']
+    
+    def validate_timestamp(self, value):
+        now = timezone.now()
+        if value > now + timedelta(minutes=5):
+            raise serializers.ValidationError('Timestamp is in the future')
+        if value < now - timedelta(days=settings.ACTIVITY_BATCH_MAX_AGE_DAYS):
+            raise serializers.ValidationError(
+                f'Timestamp is older than {settings.ACTIVITY_BATCH_MAX_AGE_DAYS} days'
+            )
+        return value
@@ -1,11 +1,17 @@
 """
 report/services/ActivityService.py - Activity tracking business logic
 """
-from django.db import transaction
-from django.db.models import Sum, Count
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Sum, Count, Q
+from django.db.models.functions import TruncMonth, TruncWeek
 from django.utils import timezone
 from datetime import timedelta
-from ..models import Activity
+from dashboard.service.DashboardCache import DashboardCache
+from ..models import Activity, ActivitySummary, DailyActivity
+from .StatsService import StatsService
 
 
 class ActivityService:
@@ -15,74 +21,329 @@ class ActivityService:
     def log_activity(student, event_type, lesson=None, duration_minutes=0):
         """Log a student activity"""
         try:
-            activity = Activity.objects.create(
-                student=student,
-                lesson=lesson,
-                event_type=event_type,
-                duration_minutes=duration_minutes,
-                date=timezone.now().date()
-            )
+            with transaction.atomic():
+                activity = Activity.objects.create(
+                    student=student,
+                    lesson=lesson,
+                    event_type=event_type,
+                    duration_minutes=duration_minutes,
+                    date=student.local_date()
+                )
+                ActivityService.record_daily_rollups([activity])
+            transaction.on_commit(lambda: DashboardCache.bump(student.id))
             return {'success': True, 'activity': activity}
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
     @staticmethod
-    def get_daily_time_series(student, days=30):
-        """Get daily learning time for last N days"""
+    def log_activities(student, items):
+        """
+        Log many client-reported activities for one student
+        `items` are validated ActivityBatchItemSerializer data. Rows are
+        inserted with bulk_create in ACTIVITY_BATCH_CHUNK_SIZE chunks and
+        folded into the daily rollup in the same transaction.
+        """
         try:
-            end_date = timezone.now().date()
-            start_date = end_date - timedelta(days=days)
+            activities = [
+                Activity(
+                    student=student,
+                    lesson_id=item.get('lesson_id'),
+                    event_type=item['event_type'],
+                    duration_minutes=item.get('duration_minutes', 0),
+                    timestamp=item['timestamp'],
+                    date=student.local_date(item['timestamp'])
+                )
+                for item in items
+            ]
+            with transaction.atomic():
+                Activity.objects.bulk_create(
+                    activities,
+                    batch_size=getattr(settings, 'ACTIVITY_BATCH_CHUNK_SIZE', 500)
+                )
+                ActivityService.record_daily_rollups(activities)
+            transaction.on_commit(lambda: DashboardCache.bump(student.id))
+            return {'success': True, 'activities': activities}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    @staticmethod
+    def record_daily_rollups(activities):
+        """
+        Fold newly written activities into the DailyActivity rollup
+        Activities are summed per (student, date) and applied with a single
+        INSERT ... ON CONFLICT DO UPDATE that increments the existing rows.
+        Each active day is also folded into the student's stored streak.
+        Must run in the transaction that wrote the activities.
+        """
+        totals = defaultdict(lambda: [0, 0, 0])
+        for activity in activities:
+            row = totals[(activity.student_id, activity.date)]
+            row[0] += activity.duration_minutes or 0
+            row[1] += activity.event_type == 'session_start'
+            row[2] += activity.event_type == 'lesson_complete'
+        
+        if not totals:
+            return
+        
+        qn = connection.ops.quote_name
+        table = qn(DailyActivity._meta.db_table)
+        columns = ['student_id', 'date', 'minutes', 'sessions', 'lessons_completed']
+        values = []
+        params = []
+        for (student_id, date), (minutes, sessions, lessons_completed) in totals.items():
+            values.append('(%s, %s, %s, %s, %s)')
+            params.extend([
+                student_id,
+                connection.ops.adapt_datefield_value(date),
+                minutes,
+                sessions,
+                lessons_completed
+            ])
+        
+        increments = ', '.join(
+            f'{qn(column)} = {table}.{qn(column)} + EXCLUDED.{qn(column)}'
+            for column in columns[2:]
+        )
+        sql = (
+            f'INSERT INTO {table} ({", ".join(qn(column) for column in columns)}) '
+            f'VALUES {", ".join(values)} '
+            f'ON CONFLICT ({qn("student_id")}, {qn("date")}) DO UPDATE SET {increments}'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+        
+        for student_id, date in sorted(totals, key=lambda key: key[1]):
+            StatsService.record_active_day(student_id, date)
+    
+    @staticmethod
+    def rebuild_daily_rollups(student_ids=None):
+        """
+        Recompute DailyActivity from raw activities and compacted summaries
+        Rebuilds every student when `student_ids` is None.
+        Returns the number of rollup rows written.
+        """
+        activities = Activity.objects.all()
+        summaries = ActivitySummary.objects.all()
+        rollups = DailyActivity.objects.all()
+        if student_ids is not None:
+            activities = activities.filter(student_id__in=student_ids)
+            summaries = summaries.filter(student_id__in=student_ids)
+            rollups = rollups.filter(student_id__in=student_ids)
+        
+        totals = defaultdict(lambda: [0, 0, 0])
+        for source in (
+            activities.order_by().values('student_id', 'date').annotate(
+                minutes=Sum('duration_minutes'),
+                sessions=Count('id', filter=Q(event_type='session_start')),
+                lessons_completed=Count('id', filter=Q(event_type='lesson_complete'))
+            ),
+            summaries.order_by().values('student_id', 'date').annotate(
+                minutes=Sum('minutes'),
+                sessions=Sum('events', filter=Q(event_type='session_start')),
+                lessons_completed=Sum('events', filter=Q(event_type='lesson_complete'))
+            ),
+        ):
+            for row in source:
+                total = totals[(row['student_id'], row['date'])]
+                total[0] += row['minutes'] or 0
+                total[1] += row['sessions'] or 0
+                total[2] += row['lessons_completed'] or 0
+        
+        rows = [
+            DailyActivity(
+                student_id=student_id,
+                date=date,
+                minutes=minutes,
+                sessions=sessions,
+                lessons_completed=lessons_completed
+            )
+            for (student_id, date), (minutes, sessions, lessons_completed) in totals.items()
+        ]
+        
+        with transaction.atomic():
+            rollups.delete()
+            DailyActivity.objects.bulk_create(rows, batch_size=1000)
+        return len(rows)
+    
+    @staticmethod
+    def compact_activities(before_date, chunk_size=1000):
+        """
+        Fold up to `chunk_size` raw activities dated before `before_date`
+        into ActivitySummary and delete them, in one short transaction.
+        DailyActivity already holds these events, so dashboard numbers do
+        not change. Returns the number of activities compacted.
+        """
+        with transaction.atomic():
+            ids = list(
+                Activity.objects.filter(date__lt=before_date).order_by('id').values_list('id', flat=True)[:chunk_size]
+            )
+            if not ids:
+                return 0
+            
+            groups = list(
+                Activity.objects.filter(id__in=ids).values(
+                    'student_id', 'lesson_id', 'date', 'event_type'
+                ).annotate(
+                    minutes=Sum('duration_minutes'),
+                    events=Count('id')
+                ).order_by()
+            )
             
-            activities = Activity.objects.filter(
+            ActivityService._merge_summaries(groups)
+            Activity.objects.filter(id__in=ids).delete()
+        return len(ids)
+    
+    @staticmethod
+    def _merge_summaries(groups):
+        """
+        Add aggregated activity groups (student_id, lesson_id, date,
+        event_type, minutes, events) to ActivitySummary. Call inside a
+        transaction; the matching summary rows are locked while merged.
+        """
+        existing = {
+            (summary.student_id, summary.lesson_id, summary.date, summary.event_type): summary
+            for summary in ActivitySummary.objects.select_for_update().filter(
+                student_id__in={group['student_id'] for group in groups},
+                date__in={group['date'] for group in groups}
+            )
+        }
+        created = []
+        updated = []
+        for group in groups:
+            key = (group['student_id'], group['lesson_id'], group['date'], group['event_type'])
+            summary = existing.get(key)
+            if summary is None:
+                created.append(ActivitySummary(
+                    student_id=group['student_id'],
+                    lesson_id=group['lesson_id'],
+                    date=group['date'],
+                    event_type=group['event_type'],
+                    minutes=group['minutes'] or 0,
+                    events=group['events']
+                ))
+            else:
+                summary.minutes += group['minutes'] or 0
+                summary.events += group['events']
+                updated.append(summary)
+        
+        ActivitySummary.objects.bulk_create(created)
+        ActivitySummary.objects.bulk_update(updated, ['minutes', 'events'])
+    
+    @staticmethod
+    def detach_activity_partitions(before_date, drop=False, chunk_size=1000):
+        """
+        Retire the monthly activities partitions that end on or before
+        `before_date` (PostgreSQL with a partitioned activities table only).
+        Each partition is summarized into ActivitySummary with one GROUP BY
+        and detached in the same transaction, so its rows leave the table
+        without row-by-row deletes and the rebuilds keep their totals.
+        The detached table is dropped when `drop` is set.
+        Returns the names of the partitions detached.
+        """
+        from .. import partitioning
+        
+        detached = []
+        for name, month_start in partitioning.monthly_partitions():
+            if partitioning.add_months(month_start, 1) > before_date:
+                break
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'SELECT student_id, lesson_id, date, event_type, '
+                        f'SUM(duration_minutes), COUNT(*) FROM {name} '
+                        f'GROUP BY student_id, lesson_id, date, event_type'
+                    )
+                    columns = ['student_id', 'lesson_id', 'date', 'event_type', 'minutes', 'events']
+                    while True:
+                        rows = cursor.fetchmany(chunk_size)
+                        if not rows:
+                            break
+                        ActivityService._merge_summaries([dict(zip(columns, row)) for row in rows])
+                partitioning.detach_partition(name, drop=drop)
+            detached.append(name)
+        return detached
+    
+    @staticmethod
+    def get_daily_time_series(student, days=30):
+        """Get daily learning time for the last N days, including today"""
+        end_date = student.local_date()
+        return ActivityService.get_time_series(student, end_date - timedelta(days=days - 1), end_date)
+    
+    @staticmethod
+    def get_time_series(student, start, end, granularity='day'):
+        """
+        Get learning time between two dates in day, week or month buckets
+        Buckets are summed in the database from the DailyActivity rollup, so
+        the result has one point per bucket, not one per day. Each point is
+        labelled with the first day of its bucket (weeks start on Monday).
+        """
+        try:
+            rows = DailyActivity.objects.filter(
                 student=student,
-                date__gte=start_date,
-                date__lte=end_date
-            ).values('date').annotate(
-                total_minutes=Sum('duration_minutes')
-            ).order_by('date')
+                date__gte=start,
+                date__lte=end
+            )
+            if granularity == 'day':
+                totals = dict(rows.values_list('date', 'minutes'))
+            else:
+                trunc = TruncWeek if granularity == 'week' else TruncMonth
+                totals = {
+                    row['bucket']: row['minutes']
+                    for row in rows.annotate(bucket=trunc('date')).values('bucket').annotate(
+                        minutes=Sum('minutes')
+                    ).order_by('bucket')
+                }
             
-            # Create a complete date range
+            # Fill empty buckets; the range is bounded by the caller
             result = []
-            current_date = start_date
-            activities_dict = {act['date']: act['total_minutes'] for act in activities}
-            
-            while current_date <= end_date:
+            current_date = ActivityService._bucket_start(start, granularity)
+            while current_date <= end:
                 result.append({
                     'date': current_date.isoformat(),
-                    'minutes': activities_dict.get(current_date, 0)
+                    'minutes': totals.get(current_date, 0)
                 })
-                current_date += timedelta(days=1)
+                current_date = ActivityService._next_bucket(current_date, granularity)
             
             return {'success': True, 'data': result}
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    @staticmethod
+    def _bucket_start(date, granularity):
+        if granularity == 'week':
+            return date - timedelta(days=date.weekday())
+        if granularity == 'month':
+            return date.replace(day=1)
+        return date
+    
+    @staticmethod
+    def _next_bucket(date, granularity):
+        if granularity == 'week':
+            return date + timedelta(days=7)
+        if granularity == 'month':
+            return (date.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return date + timedelta(days=1)
+    
     @staticmethod
     def get_learning_streak(student):
-        """Calculate current learning streak"""
+        """Get the current learning streak stored on StudentStats"""
         try:
-            today = timezone.now().date()
-            activities = Activity.objects.filter(
-                student=student
-            ).values('date').distinct().order_by('-date')
-            
-            if not activities:
-                return {'success': True, 'streak': 0}
-            
-            streak = 0
-            current_date = today
-            
-            for activity in activities:
-                if activity['date'] == current_date:
-                    streak += 1
-                    current_date -= timedelta(days=1)
-                elif activity['date'] == current_date - timedelta(days=1):
-                    streak += 1
-                    current_date = activity['date'] - timedelta(days=1)
-                else:
-                    break
-            
-            return {'success': True, 'streak': streak}
+            stats = StatsService.get_stats(student)
+            return {'success': True, 'streak': StatsService.current_streak(stats, today=student.local_date())}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    @staticmethod
+    def get_streak_history(student):
+        """Get the current and longest streak, streak count and every streak, newest first"""
+        try:
+            history = StatsService.get_streak_histories([student.id])[student.id]
+            data = StatsService.summarize_streaks(history, student.local_date())
+            data['history'] = [
+                {'start': start.isoformat(), 'end': end.isoformat(), 'days': days}
+                for start, end, days in reversed(history)
+            ]
+            return {'success': True, 'data': data}
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
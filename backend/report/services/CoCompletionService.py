@@ -0,0 +1,88 @@
+"""
+report/services/CoCompletionService.py - Offline item-to-item lesson similarity from completions
+"""
+from django.db import transaction
+from ..models import LessonNeighbor, Progress
+
+
+class CoCompletionService:
+    """
+    Builds the LessonNeighbor table ("students who completed X also
+    completed Y") from completed Progress rows.
+
+    The student x lesson completion matrix is assembled as a SciPy sparse
+    matrix and multiplied by its transpose to count co-completions, which
+    are normalized to cosine similarity. Only the top-k neighbours of each
+    lesson are stored, so request-time lookups are a single indexed query.
+    """
+
+    @staticmethod
+    def build_neighbors(top_k=10, min_support=2):
+        """
+        Recompute LessonNeighbor from every completed Progress row.
+        Pairs completed together by fewer than `min_support` students are
+        ignored. Returns {'lessons': lessons with neighbours, 'neighbors': rows written}.
+        """
+        import numpy as np
+        from scipy import sparse
+
+        pairs = np.fromiter(
+            (
+                value
+                for pair in Progress.objects.filter(status='completed').values_list(
+                    'student_id', 'lesson_id'
+                ).iterator(chunk_size=10000)
+                for value in pair
+            ),
+            dtype=np.int64
+        ).reshape(-1, 2)
+
+        rows = []
+        if len(pairs):
+            student_ids, student_index = np.unique(pairs[:, 0], return_inverse=True)
+            lesson_ids, lesson_index = np.unique(pairs[:, 1], return_inverse=True)
+            completions = sparse.csr_matrix(
+                (np.ones(len(pairs), dtype=np.float32), (student_index, lesson_index)),
+                shape=(len(student_ids), len(lesson_ids))
+            )
+
+            # Lesson x lesson co-completion counts; the diagonal holds each
+            # lesson's own completion count
+            counts = (completions.T @ completions).tocsr()
+            totals = counts.diagonal()
+            counts.setdiag(0)
+            counts.data[counts.data < min_support] = 0
+            counts.eliminate_zeros()
+
+            # Cosine similarity: co-completions / sqrt(completions(X) * completions(Y)),
+            # computed over the stored entries so it shares the counts' layout
+            norms = np.sqrt(totals)
+            row_of = np.repeat(np.arange(len(lesson_ids)), np.diff(counts.indptr))
+            similarity = counts.data / (norms[row_of] * norms[counts.indices])
+
+            for index in range(len(lesson_ids)):
+                start, end = counts.indptr[index], counts.indptr[index + 1]
+                if start == end:
+                    continue
+                scores = similarity[start:end]
+                columns = counts.indices[start:end]
+                support = counts.data[start:end]
+                if len(scores) > top_k:
+                    best = np.argpartition(-scores, top_k - 1)[:top_k]
+                    scores, columns, support = scores[best], columns[best], support[best]
+                for score, column, students in zip(scores, columns, support):
+                    rows.append(LessonNeighbor(
+                        lesson_id=int(lesson_ids[index]),
+                        neighbor_id=int(lesson_ids[column]),
+                        score=float(score),
+                        students=int(students)
+                    ))
+
+        with transaction.atomic():
+            LessonNeighbor.objects.all().delete()
+            LessonNeighbor.objects.bulk_create(rows, batch_size=1000)
+
+        return {
+            'lessons': len({row.lesson_id for row in rows}),
+            'neighbors': len(rows)
+        }
@@ -0,0 +1,138 @@
+"""
+report/services/CourseProgressService.py - Denormalized next-lesson pointers per student and course
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from courses.models import Lesson
+from ..models import CourseProgress, Progress
+
+
+class CourseProgressService:
+    """
+    Service class for the denormalized CourseProgress table.
+
+    There is one row per student and course the student has a Progress row
+    in, holding the first lesson (by order) that is not completed and the
+    number of completed lessons. ProgressService refreshes the touched
+    courses on every status change and LessonService after adding a
+    lesson; catalog edits made elsewhere (admin, reordering) need
+    `rebuild_course_progress`. The rows back the student's
+    GET /api/report/next/<course_id> lookup.
+    """
+
+    @staticmethod
+    def get_next_lesson(student, course_id):
+        """
+        Next unfinished lesson of a course from a single-row read
+        Students without a row get the first lesson of the course. A NULL
+        pointer only means the course is finished while every lesson is
+        completed; deleting the pointed-to lesson also nulls it, in which
+        case the row is recomputed.
+        """
+        try:
+            row = CourseProgressService._read(student, course_id)
+            if row is not None and row['next_lesson_id'] is None and (
+                row['completed'] < Lesson.objects.filter(course_id=course_id).count()
+            ):
+                CourseProgressService.refresh([student.id], [course_id])
+                row = CourseProgressService._read(student, course_id)
+            if row is None:
+                row = {
+                    'next_lesson_id': Lesson.objects.filter(
+                        course_id=course_id
+                    ).order_by('order').values_list('id', flat=True).first(),
+                    'completed': 0
+                }
+            return {'success': True, 'data': row}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    @staticmethod
+    def _read(student, course_id):
+        return CourseProgress.objects.filter(
+            student=student,
+            course_id=course_id
+        ).values('next_lesson_id', 'completed').first()
+
+    @staticmethod
+    def refresh(student_ids, course_ids=None):
+        """
+        Recompute the rows of `student_ids` from Progress, limited to
+        `course_ids` when given. Rows of courses the student no longer has
+        progress in are deleted. Returns the number of rows written.
+        """
+        progress = Progress.objects.filter(student_id__in=student_ids)
+        if course_ids is not None:
+            progress = progress.filter(lesson__course_id__in=course_ids)
+
+        touched = set()
+        completed = defaultdict(set)
+        for student_id, lesson_id, course_id, status in progress.values_list(
+            'student_id', 'lesson_id', 'lesson__course_id', 'status'
+        ).iterator(chunk_size=5000):
+            touched.add((student_id, course_id))
+            if status == 'completed':
+                completed[(student_id, course_id)].add(lesson_id)
+
+        lessons_by_course = defaultdict(list)
+        for lesson_id, course_id in Lesson.objects.filter(
+            course_id__in={course_id for _, course_id in touched}
+        ).order_by('course_id', 'order').values_list('id', 'course_id'):
+            lessons_by_course[course_id].append(lesson_id)
+
+        rows = []
+        for student_id, course_id in touched:
+            done = completed[(student_id, course_id)]
+            rows.append(CourseProgress(
+                student_id=student_id,
+                course_id=course_id,
+                next_lesson_id=next(
+                    (lesson_id for lesson_id in lessons_by_course[course_id] if lesson_id not in done),
+                    None
+                ),
+                completed=len(done)
+            ))
+
+        existing = CourseProgress.objects.filter(student_id__in=student_ids)
+        if course_ids is not None:
+            existing = existing.filter(course_id__in=course_ids)
+        stale_ids = [
+            row_id for row_id, student_id, course_id in existing.values_list('id', 'student_id', 'course_id')
+            if (student_id, course_id) not in touched
+        ]
+
+        with transaction.atomic():
+            CourseProgress.objects.bulk_create(
+                rows,
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=['student', 'course'],
+                update_fields=['next_lesson', 'completed', 'updated_at']
+            )
+            if stale_ids:
+                CourseProgress.objects.filter(id__in=stale_ids).delete()
+        return len(rows)
+
+    @staticmethod
+    def rebuild(student_ids=None, course_ids=None, chunk_size=500):
+        """
+        Recompute CourseProgress in chunks of `chunk_size` students.
+        Rebuilds every student with progress (or a row) when `student_ids`
+        is None, and only `course_ids` when given.
+        Returns the number of rows written.
+        """
+        if student_ids is None:
+            progress = Progress.objects.all()
+            existing = CourseProgress.objects.all()
+            if course_ids is not None:
+                progress = progress.filter(lesson__course_id__in=course_ids)
+                existing = existing.filter(course_id__in=course_ids)
+            student_ids = set(progress.values_list('student_id', flat=True).distinct())
+            student_ids.update(existing.values_list('student_id', flat=True).distinct())
+
+        student_ids = sorted(student_ids)
+        written = 0
+        for i in range(0, len(student_ids), chunk_size):
+            written += CourseProgressService.refresh(student_ids[i:i + chunk_size], course_ids)
+        return written
@@ -0,0 +1,227 @@
+"""
+report/services/HeartbeatBuffer.py - Write-behind buffer for lesson player heartbeats
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from dashboard.service.DashboardCache import DashboardCache
+from users.models import User
+from ..models import Activity, Progress
+from .ActivityService import ActivityService
+from .CourseProgressService import CourseProgressService
+from .ProgressService import ProgressService
+from .StatsService import StatsService
+
+logger = logging.getLogger(__name__)
+
+
+class HeartbeatBuffer:
+    """
+    Coalesces heartbeat seconds per (student, lesson) in process memory.
+
+    Heartbeats only touch a dict. Whole minutes are written to Progress and
+    Activity in bulk once HEARTBEAT_FLUSH_INTERVAL seconds have passed since
+    the last flush or HEARTBEAT_FLUSH_SIZE keys are pending; leftover seconds
+    stay buffered for the next flush. With `background`, a daemon thread
+    (started on the first heartbeat, so each forked worker gets its own)
+    flushes on that interval, and a full buffer only wakes it, so request
+    threads never write; otherwise add() flushes inline when a threshold is
+    reached. Each process flushes its buffer on exit, counting leftover
+    seconds as a whole minute, so a crash loses at most one interval of
+    heartbeats.
+    """
+
+    def __init__(self, background=False):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._seconds = defaultdict(int)
+        self._last_flush = time.monotonic()
+        self._background = background
+        self._wake = threading.Event()
+        self._flusher = None
+
+    def add(self, student_id, lesson_id, seconds):
+        """Buffer heartbeat seconds, flushing (or waking the flusher) if a threshold is reached"""
+        with self._lock:
+            self._seconds[(student_id, lesson_id)] += seconds
+            full = len(self._seconds) >= getattr(settings, 'HEARTBEAT_FLUSH_SIZE', 500)
+            due = full or time.monotonic() - self._last_flush >= getattr(settings, 'HEARTBEAT_FLUSH_INTERVAL', 60)
+        if self._background:
+            self._ensure_flusher()
+            if full:
+                self._wake.set()
+        elif due:
+            self.flush()
+
+    def _ensure_flusher(self):
+        """Start the flusher thread if this process does not have a live one"""
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._lock:
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = threading.Thread(target=self._run_flusher, name='heartbeat-flusher', daemon=True)
+                self._flusher.start()
+
+    def _run_flusher(self):
+        while True:
+            self._wake.wait(timeout=getattr(settings, 'HEARTBEAT_FLUSH_INTERVAL', 60))
+            self._wake.clear()
+            try:
+                self.flush()
+            finally:
+                # This thread's own connection; reopened on the next flush
+                connection.close()
+
+    def pending_seconds(self, student_id, lesson_id):
+        """Seconds buffered for a student and lesson but not yet written"""
+        with self._lock:
+            return self._seconds.get((student_id, lesson_id), 0)
+
+    def _take_minutes(self, final=False):
+        """
+        Remove whole buffered minutes, keeping the leftover seconds
+        With `final`, leftover seconds are rounded up to a minute instead.
+        """
+        with self._lock:
+            self._last_flush = time.monotonic()
+            minutes = {}
+            for key, seconds in list(self._seconds.items()):
+                if final:
+                    minutes[key] = -(-seconds // 60)
+                    self._seconds[key] = 0
+                elif seconds >= 60:
+                    minutes[key] = seconds // 60
+                    self._seconds[key] = seconds % 60
+                if not self._seconds[key]:
+                    del self._seconds[key]
+            return minutes
+
+    def _restore_minutes(self, minutes):
+        """Put minutes back after a failed flush so they are retried"""
+        with self._lock:
+            for key, count in minutes.items():
+                self._seconds[key] += count * 60
+
+    def flush(self, final=False):
+        """
+        Write buffered whole minutes to the database, or everything with
+        `final` (on exit). Returns the number of (student, lesson) rows written.
+        """
+        # One flush at a time per process; concurrent callers skip, but the
+        # final flush waits for a running one
+        acquired = self._flush_lock.acquire(timeout=30) if final else self._flush_lock.acquire(blocking=False)
+        if not acquired:
+            return 0
+        try:
+            minutes = self._take_minutes(final=final)
+            if not minutes:
+                return 0
+            try:
+                return HeartbeatBuffer._write(minutes)
+            except Exception:
+                logger.exception('Heartbeat flush failed; keeping %d entries buffered', len(minutes))
+                self._restore_minutes(minutes)
+                return 0
+        finally:
+            self._flush_lock.release()
+
+    @staticmethod
+    def _write(minutes):
+        """Apply one batch of buffered minutes, returning the rows written"""
+        from courses.models import Lesson
+
+        # Heartbeats are not validated per request; drop lessons and
+        # students that do not exist (any more)
+        lesson_courses = dict(
+            Lesson.objects.filter(
+                id__in={lesson_id for _, lesson_id in minutes}
+            ).values_list('id', 'course_id')
+        )
+        students = User.objects.only('id', 'timezone').in_bulk(
+            {student_id for student_id, _ in minutes}
+        )
+        minutes = {
+            (student_id, lesson_id): count for (student_id, lesson_id), count in minutes.items()
+            if lesson_id in lesson_courses and student_id in students
+        }
+        if not minutes:
+            return 0
+
+        now = timezone.now()
+        local_dates = {
+            student_id: student.local_date(now) for student_id, student in students.items()
+        }
+        with transaction.atomic():
+            created = ProgressService.add_time_spent(minutes, now=now)
+
+            activities = Activity.objects.bulk_create([
+                Activity(
+                    student_id=student_id,
+                    lesson_id=lesson_id,
+                    event_type='heartbeat',
+                    duration_minutes=count,
+                    timestamp=now,
+                    date=local_dates[student_id]
+                )
+                for (student_id, lesson_id), count in minutes.items()
+            ])
+
+            time_by_student = defaultdict(int)
+            for (student_id, _), count in minutes.items():
+                time_by_student[student_id] += count
+
+            # New rows are in_progress and may be the student's first in their course
+            created_lessons = defaultdict(set)
+            for student_id, lesson_id in created:
+                created_lessons[student_id].add(lesson_id)
+            new_courses = HeartbeatBuffer._new_courses(created_lessons, lesson_courses)
+            for student_id, total in time_by_student.items():
+                StatsService.apply_deltas(
+                    student_id,
+                    in_progress=len(created_lessons.get(student_id, ())),
+                    time_spent=total,
+                    courses_touched=len(new_courses.get(student_id, ())),
+                    last_activity=now
+                )
+
+            ActivityService.record_daily_rollups(activities)
+
+            if created_lessons:
+                CourseProgressService.refresh(
+                    list(created_lessons),
+                    {lesson_courses[lesson_id] for _, lesson_id in created}
+                )
+            for student_id, lesson_ids in created_lessons.items():
+                ProgressService._refresh_recommendations_on_commit(students[student_id], list(lesson_ids))
+
+            for student_id in time_by_student:
+                transaction.on_commit(lambda student_id=student_id: DashboardCache.bump(student_id))
+
+        return len(minutes)
+
+    @staticmethod
+    def _new_courses(created_lessons, lesson_courses):
+        """Per student, the courses whose only Progress rows are the ones in `created_lessons`"""
+        new_courses = defaultdict(set)
+        for student_id, lesson_ids in created_lessons.items():
+            new_courses[student_id] = {lesson_courses[lesson_id] for lesson_id in lesson_ids}
+        if not created_lessons:
+            return new_courses
+
+        for student_id, lesson_id, course_id in Progress.objects.filter(
+            student_id__in=list(created_lessons),
+            lesson__course_id__in=set().union(*new_courses.values())
+        ).values_list('student_id', 'lesson_id', 'lesson__course_id'):
+            if lesson_id not in created_lessons[student_id]:
+                new_courses[student_id].discard(course_id)
+        return new_courses
+
+
+heartbeat_buffer = HeartbeatBuffer(background=True)
+atexit.register(heartbeat_buffer.flush, final=True)
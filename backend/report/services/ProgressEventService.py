@@ -0,0 +1,240 @@
+"""
+report/services/ProgressEventService.py - Append-only progress event log and its projector
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from users.models import User
+from ..models import ProgressEvent, ProjectorCheckpoint
+from .ProgressService import ProgressService
+
+logger = logging.getLogger(__name__)
+
+
+class ProjectionError(Exception):
+    """Raised inside a projection savepoint to roll back a failed write"""
+
+
+class ProgressEventService:
+    """
+    Service class for the progress event log.
+
+    In 'events' write mode the progress endpoints only append to
+    ProgressEvent, which takes no row locks. The projector then folds the
+    events, in id order, into Progress, Activity, StudentStats and the
+    daily rollup through ProgressService.batch_update_progress, so the read
+    models trail the writes by roughly one projector interval.
+
+    An event that cannot be applied is parked (failed_at and error set)
+    instead of blocking the log or taking the student's other events with
+    it; retry_parked applies parked events again once the cause is fixed.
+    """
+
+    CHECKPOINT_NAME = 'progress'
+
+    @staticmethod
+    def is_enabled():
+        """Whether the write endpoints should append events instead of writing Progress"""
+        return getattr(settings, 'PROGRESS_WRITE_MODE', 'direct') == 'events'
+
+    @staticmethod
+    def record(student, updates):
+        """
+        Append one event per update
+        `updates` has the same shape as for batch_update_progress.
+        """
+        try:
+            from courses.models import Lesson
+
+            lesson_ids = {update['lesson_id'] for update in updates}
+            found = set(Lesson.objects.filter(id__in=lesson_ids).values_list('id', flat=True))
+            missing = sorted(lesson_ids - found)
+            if missing:
+                return {'success': False, 'error': f'Lessons not found: {missing}'}
+
+            now = timezone.now()
+            events = ProgressEvent.objects.bulk_create([
+                ProgressEvent(
+                    student=student,
+                    lesson_id=update['lesson_id'],
+                    status=update.get('status'),
+                    time_spent=update.get('time_spent'),
+                    notes=update.get('notes'),
+                    created_at=now
+                )
+                for update in updates
+            ])
+            return {'success': True, 'events': events}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    @staticmethod
+    def project_batch(batch_size=500, settle_seconds=None):
+        """
+        Fold the next batch of events into the read models.
+
+        Events are read in id order after the checkpoint. Ids are assigned
+        at insert but become visible at commit, so only events older than
+        the settle window are projected; the batch stops at the first newer
+        one so a slow transaction cannot be skipped. The checkpoint row is
+        locked and advanced in the same transaction as the projection.
+        """
+        if settle_seconds is None:
+            settle_seconds = getattr(settings, 'PROGRESS_PROJECTOR_SETTLE_SECONDS', 2)
+
+        try:
+            with transaction.atomic():
+                ProjectorCheckpoint.objects.get_or_create(name=ProgressEventService.CHECKPOINT_NAME)
+                checkpoint = ProjectorCheckpoint.objects.select_for_update().get(
+                    name=ProgressEventService.CHECKPOINT_NAME
+                )
+
+                cutoff = timezone.now() - timedelta(seconds=settle_seconds)
+                events = []
+                for event in ProgressEvent.objects.filter(
+                    id__gt=checkpoint.last_event_id
+                ).order_by('id')[:batch_size]:
+                    if event.created_at > cutoff:
+                        break
+                    events.append(event)
+
+                if not events:
+                    return {'success': True, 'processed': 0, 'failed': 0}
+
+                by_student = defaultdict(list)
+                for event in events:
+                    by_student[event.student_id].append(event)
+
+                parked = ProgressEventService._project_events(by_student)
+
+                checkpoint.last_event_id = events[-1].id
+                checkpoint.save(update_fields=['last_event_id', 'updated_at'])
+
+            return {'success': True, 'processed': len(events), 'failed': len(parked)}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    @staticmethod
+    def retry_parked(batch_size=500, after_id=0):
+        """
+        Apply the next `batch_size` parked events after `after_id` again, in
+        id order. Events that now succeed are unparked; the others stay
+        parked with their latest error. `last_id` in the result is the
+        cursor for the next call (None once there are no more).
+        """
+        try:
+            with transaction.atomic():
+                events = list(
+                    ProgressEvent.objects.select_for_update().filter(
+                        failed_at__isnull=False,
+                        id__gt=after_id
+                    ).order_by('id')[:batch_size]
+                )
+                by_student = defaultdict(list)
+                for event in events:
+                    by_student[event.student_id].append(event)
+
+                parked = {event.id for event in ProgressEventService._project_events(by_student)}
+                recovered = [event for event in events if event.id not in parked]
+                for event in recovered:
+                    event.failed_at = None
+                    event.error = None
+                ProgressEvent.objects.bulk_update(recovered, ['failed_at', 'error'])
+
+            return {
+                'success': True,
+                'processed': len(recovered),
+                'failed': len(parked),
+                'last_id': events[-1].id if events else None
+            }
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    @staticmethod
+    def _project_events(by_student):
+        """
+        Apply {student_id: [events]} student by student. When a student's
+        batch fails, its events are applied one at a time, in order, and
+        only the failing ones are parked. Returns the parked events.
+        """
+        students = User.objects.in_bulk(list(by_student))
+        now = timezone.now()
+        parked = []
+        for student_id, student_events in by_student.items():
+            student = students.get(student_id)
+            if student is None:
+                failures = [(event, 'Student not found') for event in student_events]
+            elif ProgressEventService._apply(student, student_events) is None:
+                continue
+            else:
+                failures = []
+                for event in student_events:
+                    error = ProgressEventService._apply(student, [event])
+                    if error is not None:
+                        failures.append((event, error))
+
+            for event, error in failures:
+                event.failed_at = now
+                event.error = error
+                parked.append(event)
+            logger.error(
+                'Parked %d of %d progress events for student %s: %s',
+                len(failures), len(student_events), student_id, failures[0][1]
+            )
+
+        ProgressEvent.objects.bulk_update(parked, ['failed_at', 'error'])
+        return parked
+
+    @staticmethod
+    def _apply(student, events):
+        """Apply one student's events in a savepoint, returning the error or None"""
+        try:
+            with transaction.atomic():
+                result = ProgressService.batch_update_progress(
+                    student,
+                    [
+                        {
+                            'lesson_id': event.lesson_id,
+                            'status': event.status,
+                            'time_spent': event.time_spent,
+                            'notes': event.notes
+                        }
+                        for event in events
+                    ],
+                    now=events[-1].created_at
+                )
+                if not result['success']:
+                    raise ProjectionError(result['error'])
+        except ProjectionError as e:
+            return str(e)
+        return None
+
+    @staticmethod
+    def backlog():
+        """Number of events not yet projected"""
+        checkpoint = ProjectorCheckpoint.objects.filter(
+            name=ProgressEventService.CHECKPOINT_NAME
+        ).values_list('last_event_id', flat=True).first() or 0
+        return ProgressEvent.objects.filter(id__gt=checkpoint).count()
+
+    @staticmethod
+    def parked_count():
+        """Number of events the projector parked"""
+        return ProgressEvent.objects.filter(failed_at__isnull=False).count()
+
+    @staticmethod
+    def prune(older_than_days):
+        """Delete projected events older than `older_than_days`, returning the count; parked events are kept"""
+        checkpoint = ProjectorCheckpoint.objects.filter(
+            name=ProgressEventService.CHECKPOINT_NAME
+        ).values_list('last_event_id', flat=True).first() or 0
+        deleted, _ = ProgressEvent.objects.filter(
+            id__lte=checkpoint,
+            created_at__lt=timezone.now() - timedelta(days=older_than_days),
+            failed_at__isnull=True
+        ).delete()
+        return deleted
@@ -1,9 +1,14 @@
 
-from django.db import transaction
+from django.conf import settings
+from django.db import connection, transaction
 from django.db.models import Sum, Count , Q
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
+from dashboard.service.DashboardCache import DashboardCache
 from ..models import Progress, Activity
+from .ActivityService import ActivityService
+from .CourseProgressService import CourseProgressService
+from .StatsService import StatsService
 
 
 class ProgressService:
@@ -55,41 +60,317 @@ class ProgressService:
     
     @staticmethod
     def update_progress(student, lesson_id, status=None, time_spent=None, notes=None):
-        """Update progress for a lesson"""
+        """
+        Update progress for a lesson
+        The row is written with a single INSERT ... ON CONFLICT DO UPDATE that
+        adds `time_spent` to the stored total in the database, so concurrent
+        updates for the same lesson never lose time.
+        """
         try:
             with transaction.atomic():
-                progress, created = Progress.objects.get_or_create(
-                    student=student,
-                    lesson_id=lesson_id,
-                    defaults={'status': 'in_progress'}
-                )
-                
+                old_status = None
                 if status:
-                    progress.status = status
-                    if status == 'completed' and not progress.completed_at:
-                        progress.completed_at = timezone.now()
-                        # Create activity record
-                        Activity.objects.create(
-                            student=student,
-                            lesson=progress.lesson,
-                            event_type='lesson_complete',
-                            duration_minutes=time_spent or 0,
-                            date=timezone.now().date()
-                        )
+                    # Lock the row so the status transition seen by the stats is exact
+                    old_status = Progress.objects.select_for_update().filter(
+                        student=student,
+                        lesson_id=lesson_id
+                    ).values_list('status', flat=True).first()
+                
+                now = timezone.now()
+                progress = ProgressService._upsert_progress(
+                    student.id, lesson_id, status, time_spent or 0, notes, now
+                )
+                # `now` doubles as a sentinel: the row was inserted by this call
+                # if it kept our created_at, and completed by this call if it
+                # kept our completed_at
+                created = progress.created_at == now
+                first_completion = progress.completed_at == now
                 
-                if time_spent is not None:
-                    progress.time_spent_minutes += time_spent
+                if not created and status and old_status is None:
+                    # Another request inserted the row between our read and write
+                    StatsService.rebuild(student_ids=[student.id])
+                else:
+                    new_course = created and not Progress.objects.filter(
+                        student=student,
+                        lesson__course_id=progress.lesson.course_id
+                    ).exclude(pk=progress.pk).exists()
+                    StatsService.apply_progress_change(
+                        student.id,
+                        old_status=None if created else (old_status or progress.status),
+                        new_status=progress.status,
+                        time_delta=time_spent or 0,
+                        new_course=new_course,
+                        last_activity=progress.last_accessed
+                    )
                 
-                if notes is not None:
-                    progress.notes = notes
+                if first_completion:
+                    # Create activity record
+                    activity = Activity.objects.create(
+                        student=student,
+                        lesson_id=lesson_id,
+                        event_type='lesson_complete',
+                        duration_minutes=time_spent or 0,
+                        date=student.local_date(now)
+                    )
+                    ActivityService.record_daily_rollups([activity])
                 
-                progress.last_accessed = timezone.now()
-                progress.save()
+                transaction.on_commit(lambda: DashboardCache.bump(student.id))
+                if created or (status and old_status != progress.status):
+                    CourseProgressService.refresh([student.id], [progress.lesson.course_id])
+                    ProgressService._refresh_recommendations_on_commit(student, [lesson_id])
                 
                 return {'success': True, 'progress': progress}
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    @staticmethod
+    def _refresh_recommendations_on_commit(student, lesson_ids):
+        """Refresh the recommendations for the touched courses once the write commits"""
+        if not lesson_ids or not getattr(settings, 'RECOMMENDATION_REFRESH_ON_PROGRESS', True):
+            return
+        from .RecommendationService import RecommendationService
+        
+        transaction.on_commit(
+            lambda: RecommendationService.refresh_recommendations(student, lesson_ids)
+        )
+    
+    @staticmethod
+    def _upsert_progress(student_id, lesson_id, status, time_spent, notes, now):
+        """
+        Insert or update one Progress row in a single statement and return it
+        `status` and `notes` are left unchanged on an existing row when None.
+        """
+        qn = connection.ops.quote_name
+        table = qn(Progress._meta.db_table)
+        timestamp = connection.ops.adapt_datetimefield_value(now)
+        completed_at = timestamp if status == 'completed' else None
+        sql = f"""
+            INSERT INTO {table} (
+                {qn('student_id')}, {qn('lesson_id')}, {qn('status')}, {qn('time_spent_minutes')},
+                {qn('completed_at')}, {qn('last_accessed')}, {qn('notes')}, {qn('created_at')}, {qn('updated_at')}
+            )
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT ({qn('student_id')}, {qn('lesson_id')}) DO UPDATE SET
+                {qn('status')} = COALESCE(%s, {table}.{qn('status')}),
+                {qn('time_spent_minutes')} = {table}.{qn('time_spent_minutes')} + EXCLUDED.{qn('time_spent_minutes')},
+                {qn('completed_at')} = COALESCE({table}.{qn('completed_at')}, EXCLUDED.{qn('completed_at')}),
+                {qn('last_accessed')} = EXCLUDED.{qn('last_accessed')},
+                {qn('notes')} = COALESCE(%s, {table}.{qn('notes')}),
+                {qn('updated_at')} = EXCLUDED.{qn('updated_at')}
+            RETURNING *
+        """
+        params = [
+            student_id, lesson_id, status or 'in_progress', time_spent,
+            completed_at, timestamp, notes or '', timestamp, timestamp,
+            status, notes
+        ]
+        return list(Progress.objects.raw(sql, params))[0]
+    
+    @staticmethod
+    def add_time_spent(minutes_by_key, now=None):
+        """
+        Add buffered minutes to many Progress rows in one statement
+        `minutes_by_key` maps (student_id, lesson_id) -> minutes. Missing
+        rows are created as in_progress. Returns the keys whose rows were
+        created by this call.
+        Must run inside a transaction.
+        """
+        if not minutes_by_key:
+            return set()
+        
+        now = now or timezone.now()
+        timestamp = connection.ops.adapt_datetimefield_value(now)
+        qn = connection.ops.quote_name
+        table = qn(Progress._meta.db_table)
+        values = []
+        params = []
+        for (student_id, lesson_id), minutes in minutes_by_key.items():
+            values.append('(%s, %s, %s, %s, %s, %s, %s, %s)')
+            params.extend([student_id, lesson_id, 'in_progress', minutes, timestamp, '', timestamp, timestamp])
+        
+        sql = f"""
+            INSERT INTO {table} (
+                {qn('student_id')}, {qn('lesson_id')}, {qn('status')}, {qn('time_spent_minutes')},
+                {qn('last_accessed')}, {qn('notes')}, {qn('created_at')}, {qn('updated_at')}
+            )
+            VALUES {', '.join(values)}
+            ON CONFLICT ({qn('student_id')}, {qn('lesson_id')}) DO UPDATE SET
+                {qn('time_spent_minutes')} = {table}.{qn('time_spent_minutes')} + EXCLUDED.{qn('time_spent_minutes')},
+                {qn('last_accessed')} = EXCLUDED.{qn('last_accessed')},
+                {qn('updated_at')} = EXCLUDED.{qn('updated_at')}
+            RETURNING {qn('student_id')}, {qn('lesson_id')}, {qn('created_at')}
+        """
+        created = set()
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            for student_id, lesson_id, created_at in cursor.fetchall():
+                # Rows that kept our created_at were inserted by this statement;
+                # raw SQLite cursors return naive UTC datetimes
+                if isinstance(created_at, datetime) and timezone.is_naive(created_at):
+                    created_at = timezone.make_aware(created_at, dt_timezone.utc)
+                if created_at == timestamp or created_at == now:
+                    created.add((student_id, lesson_id))
+        return created
+    
+    @staticmethod
+    def _insert_missing_progress(student_id, lesson_ids, now):
+        """
+        Insert in_progress rows for the lessons that have none, leaving
+        existing rows (including ones a concurrent request inserted)
+        untouched. Returns the lesson ids whose rows this call created.
+        """
+        if not lesson_ids:
+            return set()
+        
+        qn = connection.ops.quote_name
+        table = qn(Progress._meta.db_table)
+        timestamp = connection.ops.adapt_datetimefield_value(now)
+        values = []
+        params = []
+        for lesson_id in lesson_ids:
+            values.append('(%s, %s, %s, %s, %s, %s, %s, %s)')
+            params.extend([student_id, lesson_id, 'in_progress', 0, timestamp, '', timestamp, timestamp])
+        
+        sql = f"""
+            INSERT INTO {table} (
+                {qn('student_id')}, {qn('lesson_id')}, {qn('status')}, {qn('time_spent_minutes')},
+                {qn('last_accessed')}, {qn('notes')}, {qn('created_at')}, {qn('updated_at')}
+            )
+            VALUES {', '.join(values)}
+            ON CONFLICT ({qn('student_id')}, {qn('lesson_id')}) DO NOTHING
+            RETURNING {qn('lesson_id')}
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return {row[0] for row in cursor.fetchall()}
+    
+    @staticmethod
+    def batch_update_progress(student, updates, now=None):
+        """
+        Apply many progress updates in one transaction
+        `updates` is a list of dicts with lesson_id and optional status,
+        time_spent and notes, applied in order with the same rules as
+        update_progress. Missing rows are inserted first (keeping any row
+        a concurrent request inserted), then every row is locked, so the
+        old statuses behind the stats deltas are exact and the final bulk
+        update cannot overwrite another write. Completions are written
+        with one bulk activity insert.
+        `now` stamps last_accessed, completed_at and the activity date.
+        """
+        try:
+            from courses.models import Lesson
+            
+            lesson_ids = list(dict.fromkeys(update['lesson_id'] for update in updates))
+            lesson_courses = dict(
+                Lesson.objects.filter(id__in=lesson_ids).values_list('id', 'course_id')
+            )
+            missing = [lesson_id for lesson_id in lesson_ids if lesson_id not in lesson_courses]
+            if missing:
+                return {'success': False, 'error': f'Lessons not found: {missing}'}
+            
+            with transaction.atomic():
+                now = now or timezone.now()
+                created = ProgressService._insert_missing_progress(student.id, lesson_ids, now)
+                rows = {
+                    progress.lesson_id: progress
+                    for progress in Progress.objects.select_for_update().filter(
+                        student=student,
+                        lesson_id__in=lesson_ids
+                    )
+                }
+                old_status = {
+                    lesson_id: progress.status
+                    for lesson_id, progress in rows.items() if lesson_id not in created
+                }
+                
+                activities = []
+                time_delta = 0
+                for update in updates:
+                    lesson_id = update['lesson_id']
+                    progress = rows[lesson_id]
+                    
+                    status = update.get('status')
+                    time_spent = update.get('time_spent')
+                    if status:
+                        progress.status = status
+                        if status == 'completed' and not progress.completed_at:
+                            progress.completed_at = now
+                            activities.append(Activity(
+                                student=student,
+                                lesson_id=lesson_id,
+                                event_type='lesson_complete',
+                                duration_minutes=time_spent or 0,
+                                date=student.local_date(now)
+                            ))
+                    
+                    if time_spent is not None:
+                        progress.time_spent_minutes += time_spent
+                        time_delta += time_spent
+                    
+                    if update.get('notes') is not None:
+                        progress.notes = update['notes']
+                    
+                    progress.last_accessed = now
+                    progress.updated_at = now
+                
+                # Every row is locked, so writing the folded values is safe
+                Progress.objects.bulk_update(
+                    list(rows.values()),
+                    ['status', 'time_spent_minutes', 'completed_at', 'last_accessed', 'notes', 'updated_at'],
+                    batch_size=500
+                )
+                if activities:
+                    Activity.objects.bulk_create(activities)
+                
+                # Courses this batch touched for the first time
+                created_courses = {lesson_courses[lesson_id] for lesson_id in created}
+                if created_courses:
+                    created_courses -= set(
+                        Progress.objects.filter(
+                            student=student,
+                            lesson__course_id__in=created_courses
+                        ).exclude(
+                            lesson_id__in=created
+                        ).values_list('lesson__course_id', flat=True)
+                    )
+                
+                StatsService.apply_deltas(
+                    student.id,
+                    completed=sum(
+                        (progress.status == 'completed') - (old_status.get(lesson_id) == 'completed')
+                        for lesson_id, progress in rows.items()
+                    ),
+                    in_progress=sum(
+                        (progress.status == 'in_progress') - (old_status.get(lesson_id) == 'in_progress')
+                        for lesson_id, progress in rows.items()
+                    ),
+                    time_spent=time_delta,
+                    courses_touched=len(created_courses),
+                    last_activity=now
+                )
+                # After the stats deltas, so a missing stats row is rebuilt only once
+                ActivityService.record_daily_rollups(activities)
+                
+                changed = [
+                    lesson_id for lesson_id, progress in rows.items()
+                    if progress.status != old_status.get(lesson_id)
+                ]
+                if changed:
+                    CourseProgressService.refresh(
+                        [student.id], {lesson_courses[lesson_id] for lesson_id in changed}
+                    )
+                
+                transaction.on_commit(lambda: DashboardCache.bump(student.id))
+                ProgressService._refresh_recommendations_on_commit(student, changed)
+            
+            progress_list = Progress.objects.filter(
+                student=student,
+                lesson_id__in=lesson_ids
+            ).select_related('lesson__course')
+            return {'success': True, 'progress': list(progress_list)}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
     @staticmethod
     def mark_lesson_complete(student, lesson_id, time_spent=0):
         """Mark a lesson as complete"""
@@ -248,28 +529,22 @@ class ProgressService:
     @staticmethod
     def get_student_overall_stats_optimized(student):
         """
-        Get overall statistics for a student with SINGLE aggregation query
-        This replaces multiple individual calls with one efficient query
+        Get overall statistics for a student from the denormalized StudentStats row
+        update_progress keeps the row current, so this is a primary-key lookup
         """
         try:
-            from ..models import Progress
             from courses.models import Lesson
             
-            # Single aggregation query for ALL stats
-            stats = Progress.objects.filter(student=student).aggregate(
-                total_completed=Count('id', filter=Q(status='completed')),
-                total_in_progress=Count('id', filter=Q(status='in_progress')),
-                total_time=Sum('time_spent_minutes'),
-                courses_count=Count('lesson__course', distinct=True)
-            )
+            # Single primary-key lookup on the denormalized stats row
+            student_stats = StatsService.get_stats(student)
             
             # Get total published lessons (single query, can be cached)
             total_published_lessons = Lesson.objects.filter(
                 course__is_published=True
             ).count()
             
-            completed_count = stats['total_completed'] or 0
-            total_time = stats['total_time'] or 0
+            completed_count = student_stats.completed
+            total_time = student_stats.total_time_minutes
             
             overall_progress = (
                 (completed_count / total_published_lessons * 100) 
@@ -281,9 +556,9 @@ class ProgressService:
                 'stats': {
                     'total_lessons_completed': completed_count,
                     'total_time_minutes': total_time,
-                    'courses_in_progress': stats['courses_count'] or 0,
+                    'courses_in_progress': student_stats.courses_touched,
                     'overall_progress_percentage': round(overall_progress, 2),
-                    'total_in_progress': stats['total_in_progress'] or 0,  # Extra data for distribution
+                    'total_in_progress': student_stats.in_progress,  # Extra data for distribution
                     'total_published_lessons': total_published_lessons  # Extra data for distribution
                 }
             }
@@ -319,4 +594,4 @@ class ProgressService:
             
             return {'success': True, 'stats': stats_dict}
         except Exception as e:
-            return {'success': False, 'error': str(e)}
\ No newline at end of file
+            return {'success': False, 'error': str(e)}
@@ -0,0 +1,212 @@
+"""
+report/services/RecommendationEngine.py - Single-pass in-memory recommendation engine
+"""
+import logging
+import time
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from courses.models import Course, Lesson
+from report.models import Progress
+from .RecommendationStrategies import STRATEGY_REGISTRY
+
+logger = logging.getLogger(__name__)
+
+
+class StrategyBudgetExceeded(Exception):
+    """Raised inside a strategy that went over its time or query budget"""
+
+
+class _StrategyMeter:
+    """
+    Database execute wrapper that times one strategy and counts its queries.
+    The budget is checked before each query and once the strategy returns,
+    so an over-budget strategy is stopped at its next query.
+    """
+
+    def __init__(self, max_ms=None, max_queries=None):
+        self.max_ms = max_ms
+        self.max_queries = max_queries
+        self.queries = 0
+        self.started = time.perf_counter()
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def check(self):
+        if self.max_queries is not None and self.queries > self.max_queries:
+            raise StrategyBudgetExceeded(f'{self.queries} queries (budget {self.max_queries})')
+        if self.max_ms is not None and self.elapsed_ms() > self.max_ms:
+            raise StrategyBudgetExceeded(f'{self.elapsed_ms():.1f}ms (budget {self.max_ms}ms)')
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        self.check()
+        return execute(sql, params, many, context)
+
+
+class RecommendationEngine:
+    """
+    Evaluates every registered recommendation strategy for one student in memory.
+
+    All inputs are loaded up front in a constant number of queries (the
+    student's progress rows, recent course activity, and the published
+    catalog with ordered lesson ids), so the cost of a generation run no
+    longer grows with the number of courses.
+
+    With `course_ids`, only those courses and the student's in-progress
+    rows are loaded, for run_incremental.
+
+    Each strategy is timed and its queries counted; after a run, `report`
+    holds one entry per strategy with its status (ok, disabled,
+    over_budget or failed), candidate count, milliseconds and queries.
+    Strategies that fail or go over budget contribute no candidates.
+    """
+
+    # Strategies a progress write in the loaded courses can change
+    INCREMENTAL_STRATEGIES = ('in_progress', 'course_gaps', 'next_lessons')
+
+    def __init__(self, student, now=None, course_ids=None):
+        self.student = student
+        self.now = now or timezone.now()
+        self.course_ids = None if course_ids is None else list(course_ids)
+        self.report = []
+        self._load()
+
+    def _load(self):
+        """Load everything the strategies need"""
+        from report.services.ActivityService import ActivityService
+
+        # Query 1: the student's progress rows with the lesson fields we use
+        progress = Progress.objects.filter(student=self.student)
+        if self.course_ids is not None:
+            progress = progress.filter(
+                Q(lesson__course_id__in=self.course_ids) | Q(status='in_progress')
+            )
+        self.progress = list(
+            progress.values(
+                'lesson_id', 'status', 'time_spent_minutes', 'last_accessed',
+                'lesson__course_id', 'lesson__estimated_minutes'
+            )
+        )
+
+        # Query 2: courses with activity in the last 7 days, most recent first
+        activity_result = ActivityService.get_recent_course_activity(self.student, days=7)
+        recent_ids = activity_result['course_ids'] if activity_result['success'] else []
+        self.recent_course_ids = list(dict.fromkeys(
+            course_id for course_id in recent_ids
+            if course_id is not None and (self.course_ids is None or course_id in self.course_ids)
+        ))
+
+        # Query 3: the published catalog, plus any recently active course
+        courses = Course.objects.filter(
+            Q(is_published=True) | Q(id__in=self.recent_course_ids)
+        )
+        if self.course_ids is not None:
+            courses = courses.filter(id__in=self.course_ids)
+        self.courses = {
+            course['id']: course
+            for course in courses.values('id', 'title', 'difficulty', 'is_published')
+        }
+        self.published_course_ids = [
+            course_id for course_id, course in self.courses.items() if course['is_published']
+        ]
+
+        # Query 4: ordered lesson ids for every loaded course
+        self.lessons_by_course = defaultdict(list)
+        for lesson in Lesson.objects.filter(
+            course_id__in=list(self.courses)
+        ).order_by('course_id', 'order').values('id', 'course_id'):
+            self.lessons_by_course[lesson['course_id']].append(lesson['id'])
+
+        self.completed_by_course = defaultdict(set)
+        self.started_course_ids = set()
+        for row in self.progress:
+            self.started_course_ids.add(row['lesson__course_id'])
+            if row['status'] == 'completed':
+                self.completed_by_course[row['lesson__course_id']].add(row['lesson_id'])
+
+    def next_unfinished_lesson(self, course_id):
+        """First lesson of a course, in order, that is not completed"""
+        completed = self.completed_by_course[course_id]
+        for lesson_id in self.lessons_by_course[course_id]:
+            if lesson_id not in completed:
+                return lesson_id
+        return None
+
+    def run(self):
+        """Run every enabled strategy and return candidates ranked by priority"""
+        recommendations = self._run_strategies()
+
+        if len(recommendations) == 0:
+            recommendations = self._run_strategies(fallback=True)
+
+        recommendations.sort(key=lambda x: x['priority'], reverse=True)
+        return recommendations
+
+    def run_incremental(self):
+        """
+        Run only the strategies that a progress write in the loaded courses
+        can change: in-progress lessons, course gaps and next lessons.
+        Returns (candidates ranked by priority, lesson ids they replace):
+        the student's in-progress lessons and the unfinished lessons of
+        the loaded courses.
+        """
+        recommendations = self._run_strategies(names=self.INCREMENTAL_STRATEGIES)
+        recommendations.sort(key=lambda x: x['priority'], reverse=True)
+
+        replaced = {row['lesson_id'] for row in self.progress if row['status'] == 'in_progress'}
+        for course_id, lesson_ids in self.lessons_by_course.items():
+            replaced.update(
+                lesson_id for lesson_id in lesson_ids
+                if lesson_id not in self.completed_by_course[course_id]
+            )
+        return recommendations, replaced
+
+    def _run_strategies(self, names=None, fallback=False):
+        """Run the registered (fallback) strategies, metering each one into `report`"""
+        recommendations = []
+        for strategy in STRATEGY_REGISTRY.values():
+            if strategy.fallback != fallback or (names is not None and strategy.name not in names):
+                continue
+
+            entry = {'strategy': strategy.name, 'status': 'ok', 'candidates': 0, 'ms': 0.0, 'queries': 0}
+            self.report.append(entry)
+            if not strategy.is_enabled():
+                entry['status'] = 'disabled'
+                continue
+
+            meter = _StrategyMeter(*strategy.budget())
+            try:
+                # A savepoint per strategy: on PostgreSQL a failed query
+                # aborts the whole transaction, and the next strategies'
+                # queries (or the caller's writes) would fail with it.
+                # Opened outside the meter so it is not counted.
+                with transaction.atomic():
+                    with connection.execute_wrapper(meter):
+                        candidates = strategy.recommend(self)
+                    meter.check()
+            except StrategyBudgetExceeded as e:
+                candidates = []
+                entry.update(status='over_budget', error=str(e))
+                logger.warning(
+                    'Recommendation strategy %s skipped for student %s: over budget (%s)',
+                    strategy.name, self.student.id, e
+                )
+            except Exception as e:
+                candidates = []
+                entry.update(status='failed', error=str(e))
+                logger.exception(
+                    'Recommendation strategy %s failed for student %s',
+                    strategy.name, self.student.id
+                )
+
+            entry.update(
+                candidates=len(candidates),
+                ms=round(meter.elapsed_ms(), 3),
+                queries=meter.queries
+            )
+            recommendations.extend(candidates)
+        return recommendations
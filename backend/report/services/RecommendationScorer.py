@@ -0,0 +1,193 @@
+"""
+report/services/RecommendationScorer.py - Vectorized scoring stage for recommendation candidates
+"""
+import numpy as np
+from django.conf import settings
+from django.db.models import Count
+from report.models import CourseProgress, Progress
+from users.models import User
+
+
+class RecommendationScorer:
+    """
+    Scores strategy candidates with one weighted sum over NumPy feature arrays.
+
+    Each candidate becomes a row of FEATURES, all scaled to [0, 1]:
+      priority    the strategy's own priority / 100
+      recency     decay since the student last touched the lesson, or its course
+      completion  share of the lesson's course the student has completed
+      time_ratio  time spent on the lesson / its estimated minutes (capped at 1)
+      difficulty  closeness of the course difficulty to the student's level
+      popularity  log-scaled share of students who completed the lesson
+    The score is features @ weights, in priority points, so the default
+    weights keep the strategies' ordering and use the other features to
+    break ties and nudge close candidates. score() works on any (n, 6)
+    matrix, so candidates of many students can be scored in one call.
+
+    Features never depend on the other candidates, and an engine loaded
+    for a few courses (run_incremental) fills in the student level and
+    the courses it did not load from CourseProgress, so incremental and
+    full runs produce comparable scores that can be merged.
+    """
+
+    FEATURES = ('priority', 'recency', 'completion', 'time_ratio', 'difficulty', 'popularity')
+    DEFAULT_WEIGHTS = {
+        'priority': 100.0,
+        'recency': 4.0,
+        'completion': 3.0,
+        'time_ratio': 1.0,
+        'difficulty': 1.0,
+        'popularity': 2.0,
+    }
+    RECENCY_HALF_LIFE_DAYS = 7
+    DIFFICULTY_LEVELS = {'beginner': 0.0, 'intermediate': 0.5, 'advanced': 1.0}
+
+    def __init__(self, weights=None):
+        merged = dict(self.DEFAULT_WEIGHTS)
+        merged.update(getattr(settings, 'RECOMMENDATION_SCORE_WEIGHTS', {}))
+        merged.update(weights or {})
+        self.weights = np.array([merged[name] for name in self.FEATURES], dtype=np.float64)
+
+    @staticmethod
+    def score(features, weights):
+        """Weighted scores for an (n, len(FEATURES)) feature matrix"""
+        return features @ weights
+
+    def features(self, engine, candidates):
+        """(n, len(FEATURES)) feature matrix for `candidates` from the engine's loaded data"""
+        lesson_ids = np.array([candidate['lesson_id'] for candidate in candidates], dtype=np.int64)
+        course_of = {
+            lesson_id: course_id
+            for course_id, course_lessons in engine.lessons_by_course.items()
+            for lesson_id in course_lessons
+        }
+        progress = {row['lesson_id']: row for row in engine.progress}
+        candidate_courses = [
+            course_of.get(lesson_id, progress[lesson_id]['lesson__course_id'] if lesson_id in progress else None)
+            for lesson_id in lesson_ids.tolist()
+        ]
+        course_stats = self._course_stats(engine, set(candidate_courses))
+
+        course_last_access = {}
+        for row in engine.progress:
+            course_id = row['lesson__course_id']
+            if course_id not in course_last_access or row['last_accessed'] > course_last_access[course_id]:
+                course_last_access[course_id] = row['last_accessed']
+
+        student_level = self._student_level(engine)
+
+        # One grouped count for every candidate lesson
+        completions = dict(
+            Progress.objects.filter(
+                lesson_id__in=set(lesson_ids.tolist()),
+                status='completed'
+            ).values('lesson_id').annotate(count=Count('id')).values_list('lesson_id', 'count')
+        )
+
+        days_since = np.full(len(candidates), np.inf)
+        completion = np.zeros(len(candidates))
+        time_ratio = np.zeros(len(candidates))
+        difficulty = np.full(len(candidates), 0.5)
+        for i, lesson_id in enumerate(lesson_ids.tolist()):
+            row = progress.get(lesson_id)
+            course_id = candidate_courses[i]
+            last_accessed = row['last_accessed'] if row else course_last_access.get(course_id)
+            if last_accessed is not None:
+                days_since[i] = max((engine.now - last_accessed).total_seconds() / 86400, 0)
+            if row and row['lesson__estimated_minutes']:
+                time_ratio[i] = row['time_spent_minutes'] / row['lesson__estimated_minutes']
+            if course_id in course_stats:
+                completed, lesson_count, course_difficulty = course_stats[course_id]
+                if lesson_count:
+                    completion[i] = completed / lesson_count
+                difficulty[i] = self.DIFFICULTY_LEVELS.get(course_difficulty, 0.5)
+
+        # Scaled by the number of students rather than the candidates' maximum,
+        # which would change with the candidate set
+        students = User.objects.filter(role='student').count()
+        popularity = np.log1p(np.array([completions.get(lesson_id, 0) for lesson_id in lesson_ids.tolist()], dtype=np.float64))
+        if students > 0:
+            popularity = np.minimum(popularity / np.log1p(students), 1.0)
+
+        return np.column_stack([
+            np.array([candidate['priority'] for candidate in candidates], dtype=np.float64) / 100,
+            np.exp2(-days_since / self.RECENCY_HALF_LIFE_DAYS),
+            completion,
+            np.minimum(time_ratio, 1.0),
+            1 - np.abs(difficulty - student_level),
+            popularity,
+        ])
+
+    def _student_level(self, engine):
+        """Mean difficulty of the published courses the student has completed a lesson in"""
+        if engine.course_ids is None:
+            difficulties = [
+                engine.courses[course_id]['difficulty']
+                for course_id, completed in engine.completed_by_course.items()
+                if completed and course_id in engine.courses and engine.courses[course_id]['is_published']
+            ]
+        else:
+            # The engine only loaded a few courses; the pointers cover them all
+            difficulties = CourseProgress.objects.filter(
+                student=engine.student,
+                completed__gt=0,
+                course__is_published=True
+            ).values_list('course__difficulty', flat=True)
+        levels = [self.DIFFICULTY_LEVELS.get(difficulty, 0.5) for difficulty in difficulties]
+        return float(np.mean(levels)) if levels else 0.0
+
+    def _course_stats(self, engine, course_ids):
+        """{course_id: (completed lessons, lessons, difficulty)} for the candidates' courses"""
+        stats = {
+            course_id: (
+                len(engine.completed_by_course[course_id]),
+                len(engine.lessons_by_course[course_id]),
+                engine.courses[course_id]['difficulty']
+            )
+            for course_id in course_ids if course_id in engine.courses
+        }
+        missing = [course_id for course_id in course_ids if course_id is not None and course_id not in stats]
+        if missing and engine.course_ids is not None:
+            # In-progress lessons of courses outside an incremental run's scope
+            for course_id, completed, lesson_count, difficulty in CourseProgress.objects.filter(
+                student=engine.student,
+                course_id__in=missing,
+                course__is_published=True
+            ).annotate(lesson_count=Count('course__lessons')).values_list(
+                'course_id', 'completed', 'lesson_count', 'course__difficulty'
+            ):
+                stats[course_id] = (completed, lesson_count, difficulty)
+        return stats
+
+    def rank(self, engine, candidates, k, exclude=()):
+        """
+        The top `k` candidates by score, one per lesson and none from
+        `exclude`, best first. 'priority' is replaced by the rounded score.
+        """
+        if not candidates or k < 1:
+            return []
+
+        scores = self.score(self.features(engine, candidates), self.weights)
+        lesson_ids = np.array([candidate['lesson_id'] for candidate in candidates], dtype=np.int64)
+
+        # Best candidate per lesson: sort by lesson, then score descending
+        order = np.lexsort((-scores, lesson_ids))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = lesson_ids[order][1:] != lesson_ids[order][:-1]
+        best = order[first]
+        if exclude:
+            best = best[~np.isin(lesson_ids[best], list(exclude))]
+
+        if len(best) > k:
+            best = best[np.argpartition(-scores[best], k - 1)[:k]]
+        # Highest score first; ties keep the strategies' order
+        best = best[np.lexsort((best, -scores[best]))]
+
+        return [
+            {
+                'lesson_id': candidates[i]['lesson_id'],
+                'reason': candidates[i]['reason'],
+                'priority': int(round(scores[i]))
+            }
+            for i in best.tolist()
+        ]
@@ -1,10 +1,9 @@
 """
 report/services/RecommendationService.py - Adaptive recommendation logic
 """
-from django.db.models import F
-from django.utils import timezone
-from datetime import timedelta
-from report.models import Progress, Recommendation
+from django.db import transaction
+from dashboard.service.DashboardCache import DashboardCache
+from report.models import Recommendation
 
 
 class RecommendationService:
@@ -12,316 +11,165 @@ class RecommendationService:
     
     @staticmethod
     def generate_recommendations(student, limit=5):
-        """Generate personalized recommendations based on learning patterns"""
+        """
+        Generate personalized recommendations based on learning patterns
+        All strategies run in memory over data loaded by RecommendationEngine
+        in a constant number of queries; the result is diffed into the
+        existing rows so dismissed lessons stay suppressed. Candidates are
+        ranked by RecommendationScorer. `strategies` in the result is the
+        engine's per-strategy timing report.
+        """
         try:
-            recommendations = []
+            from .RecommendationEngine import RecommendationEngine
+            from .RecommendationScorer import RecommendationScorer
             
-            # Clear old recommendations
-            Recommendation.objects.filter(student=student).delete()
-            
-            # Strategy 1: Continue in-progress lessons
-            in_progress_recs = RecommendationService._recommend_in_progress(student)
-            recommendations.extend(in_progress_recs)
-            
-            # Strategy 2: Fill gaps in courses with high completion
-            gap_recs = RecommendationService._recommend_course_gaps(student)
-            recommendations.extend(gap_recs)
-            
-            # Strategy 3: Start next lesson in active courses
-            next_lesson_recs = RecommendationService._recommend_next_lessons(student)
-            recommendations.extend(next_lesson_recs)
-            
-            # Strategy 4: Revisit lessons with low time investment
-            review_recs = RecommendationService._recommend_reviews(student)
-            recommendations.extend(review_recs)
-            
-            # Strategy 5: Suggest new courses if current ones are going well
-            new_course_recs = RecommendationService._recommend_new_courses(student)
-            recommendations.extend(new_course_recs)
-            
-            # Strategy 6: If no recommendations yet, recommend starting first lessons
-            if len(recommendations) == 0:
-                beginner_recs = RecommendationService._recommend_beginner_courses(student)
-                recommendations.extend(beginner_recs)
-            
-            # Sort by priority and save top recommendations
-            recommendations.sort(key=lambda x: x['priority'], reverse=True)
-            
-            saved_recommendations = []
-            for rec in recommendations[:limit]:
-                recommendation = Recommendation.objects.create(
+            # Evaluate every strategy, then score and rank the candidates
+            engine = RecommendationEngine(student)
+            dismissed = set(
+                Recommendation.objects.filter(
                     student=student,
-                    lesson=rec['lesson'],
-                    reason=rec['reason'],
-                    priority=rec['priority']
-                )
-                saved_recommendations.append(recommendation)
+                    is_dismissed=True
+                ).values_list('lesson_id', flat=True)
+            )
+            recommendations = RecommendationScorer().rank(engine, engine.run(), limit, exclude=dismissed)
+            
+            saved_recommendations = RecommendationService._save_ranked(
+                student, recommendations, limit
+            )
             
             return {
                 'success': True,
                 'recommendations': saved_recommendations,
-                'count': len(saved_recommendations)
+                'count': len(saved_recommendations),
+                'strategies': engine.report
             }
             
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
     @staticmethod
-    def _recommend_in_progress(student):
-        """Recommend lessons that are in progress (HIGH PRIORITY)"""
-        recommendations = []
-        
+    def refresh_recommendations(student, lesson_ids, limit=5):
+        """
+        Incrementally refresh recommendations after progress writes
+        Only the strategies affected by the courses of `lesson_ids` and the
+        student's in-progress lessons are re-run; their candidates replace
+        the stored rows for the same lessons (including `lesson_ids`
+        themselves) and are merged with the rest of the stored ranking.
+        The scorer fills in what the scoped engine did not load from
+        CourseProgress, so the fresh priorities are comparable with the
+        stored ones. Students with no active recommendations are left for
+        the next full generation.
+        """
         try:
-            in_progress = Progress.objects.filter(
-                student=student,
-                status='in_progress'
-            ).select_related('lesson', 'lesson__course').order_by('-last_accessed')[:3]
+            from courses.models import Lesson
+            from .RecommendationEngine import RecommendationEngine
+            from .RecommendationScorer import RecommendationScorer
             
-            for progress in in_progress:
-                days_since_access = (timezone.now() - progress.last_accessed).days
-                priority = 90 - (days_since_access * 5)
-                
-                reason = f"You're {progress.time_spent_minutes} minutes into this lesson"
-                if days_since_access > 3:
-                    reason += f" (last accessed {days_since_access} days ago)"
-                
-                recommendations.append({
-                    'lesson': progress.lesson,
-                    'reason': reason,
-                    'priority': max(priority, 70)
-                })
-        except Exception:
-            pass
-        
-        return recommendations
-    
-    @staticmethod
-    def _recommend_course_gaps(student):
-        """Recommend completing courses with >50% progress"""
-        recommendations = []
-        
-        try:
-            # Import CourseService here to avoid circular import
-            from courses.services.CourseService import CourseService
-            
-            # Get all courses with lesson counts
-            courses_result = CourseService.get_courses_with_lesson_counts()
-            if not courses_result['success']:
-                return recommendations
-            
-            for course_data in courses_result['data']:
-                course = course_data['course']
-                total_lessons = course_data['total_lessons']
-                
-                if total_lessons == 0:
-                    continue
-                
-                completed_count = Progress.objects.filter(
-                    student=student,
-                    lesson__course=course,
-                    status='completed'
-                ).count()
-                
-                progress_percentage = (completed_count / total_lessons) * 100
-                
-                if 50 <= progress_percentage < 95:
-                    completed_lesson_ids = Progress.objects.filter(
-                        student=student,
-                        lesson__course=course,
-                        status='completed'
-                    ).values_list('lesson_id', flat=True)
-                    
-                    next_lesson = course.lessons.exclude(
-                        id__in=completed_lesson_ids
-                    ).order_by('order').first()
-                    
-                    if next_lesson:
-                        priority = 60 + int(progress_percentage * 0.3)
-                        recommendations.append({
-                            'lesson': next_lesson,
-                            'reason': f"You're {progress_percentage:.0f}% through {course.title} - finish strong!",
-                            'priority': priority
-                        })
-        except Exception:
-            pass
-        
-        return recommendations
-    
-    @staticmethod
-    def _recommend_next_lessons(student):
-        """Recommend next sequential lessons in active courses"""
-        recommendations = []
-        
-        try:
-            # Import services here to avoid circular import
-            from courses.services.CourseService import CourseService
-            from report.services.ActivityService import ActivityService
-            
-            # Get recent course activity
-            activity_result = ActivityService.get_recent_course_activity(student, days=7)
-            if not activity_result['success']:
-                return recommendations
-            
-            recent_course_ids = activity_result['course_ids']
-            
-            for course_id in recent_course_ids:
-                course_result = CourseService.get_course_by_id(course_id)
-                if not course_result['success']:
-                    continue
-                
-                course = course_result['course']
-                
-                completed_lesson_ids = Progress.objects.filter(
-                    student=student,
-                    lesson__course=course,
-                    status='completed'
-                ).values_list('lesson_id', flat=True)
+            with transaction.atomic():
+                rows = list(
+                    Recommendation.objects.select_for_update().filter(
+                        student=student
+                    ).order_by('-priority', 'id')
+                )
+                stored = [row for row in rows if not row.is_dismissed]
+                if not stored:
+                    return {'success': True, 'refreshed': False}
                 
-                next_lesson = course.lessons.exclude(
-                    id__in=completed_lesson_ids
-                ).order_by('order').first()
+                course_ids = set(
+                    Lesson.objects.filter(id__in=lesson_ids).values_list('course_id', flat=True)
+                )
+                engine = RecommendationEngine(student, course_ids=course_ids)
+                fresh, replaced = engine.run_incremental()
+                fresh = RecommendationScorer().rank(
+                    engine, fresh, limit,
+                    exclude={row.lesson_id for row in rows if row.is_dismissed}
+                )
+                replaced.update(lesson_ids)
                 
-                if next_lesson:
-                    prev_lessons = course.lessons.filter(
-                        order__lt=next_lesson.order
-                    ).order_by('-order')
-                    
-                    if prev_lessons.exists():
-                        last_completed = Progress.objects.filter(
-                            student=student,
-                            lesson=prev_lessons.first(),
-                            status='completed'
-                        ).exists()
-                        
-                        if last_completed:
-                            recommendations.append({
-                                'lesson': next_lesson,
-                                'reason': f"Next lesson in {course.title}",
-                                'priority': 55
-                            })
-        except Exception:
-            pass
-        
-        return recommendations
-    
-    @staticmethod
-    def _recommend_reviews(student):
-        """Recommend reviewing lessons with low time investment"""
-        recommendations = []
-        
-        try:
-            weak_lessons = Progress.objects.filter(
-                student=student,
-                status='completed',
-                lesson__estimated_minutes__gt=0
-            ).select_related('lesson').annotate(
-                time_ratio=F('time_spent_minutes') * 100.0 / F('lesson__estimated_minutes')
-            ).filter(time_ratio__lt=50).order_by('time_ratio')[:2]
+                kept = [
+                    {'lesson_id': row.lesson_id, 'reason': row.reason, 'priority': row.priority}
+                    for row in stored if row.lesson_id not in replaced
+                ]
+                merged = sorted(kept + fresh, key=lambda x: x['priority'], reverse=True)
+                saved_recommendations = RecommendationService._save_ranked(student, merged, limit)
             
-            for progress in weak_lessons:
-                recommendations.append({
-                    'lesson': progress.lesson,
-                    'reason': f"Quick review - you spent only {progress.time_spent_minutes}/{progress.lesson.estimated_minutes} min on this",
-                    'priority': 40
-                })
-        except Exception:
-            pass
-        
-        return recommendations
+            return {
+                'success': True,
+                'refreshed': True,
+                'recommendations': saved_recommendations,
+                'count': len(saved_recommendations),
+                'strategies': engine.report
+            }
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
     
     @staticmethod
-    def _recommend_new_courses(student):
-        """Suggest new courses if student is doing well"""
-        recommendations = []
-        
-        try:
-            # Import CourseService here to avoid circular import
-            from courses.services.CourseService import CourseService
-            
-            courses_result = CourseService.get_courses_with_lesson_counts()
-            if not courses_result['success']:
-                return recommendations
+    def _save_ranked(student, recommendations, limit):
+        """
+        Write the top `limit` candidates as the student's active recommendations
+        Only rows that changed are touched: new lessons are bulk-inserted,
+        changed reasons/priorities bulk-updated and dropped lessons
+        bulk-deleted, all in one transaction. Dismissed (student, lesson)
+        pairs are kept and never recommended again.
+        Returns the active recommendations in rank order.
+        """
+        with transaction.atomic():
+            existing = list(
+                Recommendation.objects.select_for_update().filter(student=student)
+            )
             
-            for course_data in courses_result['data']:
-                course = course_data['course']
-                total_lessons = course_data['total_lessons']
-                
-                if total_lessons == 0:
+            # One candidate per lesson (the best ranked), minus dismissed lessons
+            suppressed = {row.lesson_id for row in existing if row.is_dismissed}
+            top = []
+            for rec in recommendations:
+                if rec['lesson_id'] in suppressed:
                     continue
-                
-                completed_count = Progress.objects.filter(
-                    student=student,
-                    lesson__course=course,
-                    status='completed'
-                ).count()
-                
-                if completed_count == total_lessons:
-                    started_course_ids = Progress.objects.filter(
-                        student=student
-                    ).values_list('lesson__course_id', flat=True).distinct()
-                    
-                    new_courses_result = CourseService.get_all_courses(is_published=True)
-                    if new_courses_result['success']:
-                        new_courses = [
-                            c for c in new_courses_result['courses'] 
-                            if c.id not in started_course_ids
-                        ][:2]
-                        
-                        for new_course in new_courses:
-                            first_lesson = new_course.lessons.order_by('order').first()
-                            if first_lesson:
-                                recommendations.append({
-                                    'lesson': first_lesson,
-                                    'reason': f"Start a new challenge: {new_course.title}",
-                                    'priority': 30
-                                })
+                suppressed.add(rec['lesson_id'])
+                top.append(rec)
+                if len(top) == limit:
                     break
-        except Exception:
-            pass
-        
-        return recommendations
-    
-    @staticmethod
-    def _recommend_beginner_courses(student):
-        """Recommend beginner courses for new students"""
-        recommendations = []
-        
-        try:
-            # Import CourseService here to avoid circular import
-            from courses.services.CourseService import CourseService
-            
-            courses_result = CourseService.get_all_courses(is_published=True)
-            if not courses_result['success']:
-                return recommendations
             
-            beginner_courses = [
-                c for c in courses_result['courses'] 
-                if hasattr(c, 'difficulty') and c.difficulty == 'beginner'
-            ][:3]
-            
-            for course in beginner_courses:
-                first_lesson = course.lessons.order_by('order').first()
-                if first_lesson:
-                    recommendations.append({
-                        'lesson': first_lesson,
-                        'reason': f"Start your learning journey with {course.title}",
-                        'priority': 85
-                    })
-            
-            if len(recommendations) == 0:
-                all_courses = courses_result['courses'][:3]
-                for course in all_courses:
-                    first_lesson = course.lessons.order_by('order').first()
-                    if first_lesson:
-                        recommendations.append({
-                            'lesson': first_lesson,
-                            'reason': f"Begin with {course.title}",
-                            'priority': 80
-                        })
-        except Exception:
-            pass
+            active = {}
+            to_delete = []
+            for row in existing:
+                if row.is_dismissed:
+                    continue
+                if row.lesson_id in active:
+                    to_delete.append(row.id)
+                else:
+                    active[row.lesson_id] = row
+            
+            ranked_rows = []
+            to_create = []
+            to_update = []
+            for rec in top:
+                row = active.pop(rec['lesson_id'], None)
+                if row is None:
+                    row = Recommendation(
+                        student=student,
+                        lesson_id=rec['lesson_id'],
+                        reason=rec['reason'],
+                        priority=rec['priority']
+                    )
+                    to_create.append(row)
+                elif (row.reason, row.priority) != (rec['reason'], rec['priority']):
+                    row.reason = rec['reason']
+                    row.priority = rec['priority']
+                    to_update.append(row)
+                ranked_rows.append(row)
+            to_delete.extend(row.id for row in active.values())
+            
+            if to_delete:
+                Recommendation.objects.filter(id__in=to_delete).delete()
+            if to_update:
+                Recommendation.objects.bulk_update(to_update, ['reason', 'priority'])
+            if to_create:
+                Recommendation.objects.bulk_create(to_create)
+            
+            if to_delete or to_update or to_create:
+                transaction.on_commit(lambda: DashboardCache.bump(student.id))
         
-        return recommendations
+        return ranked_rows
     
     @staticmethod
     def dismiss_recommendation(student, recommendation_id):
@@ -334,6 +182,8 @@ class RecommendationService:
             recommendation.is_dismissed = True
             recommendation.save()
             
+            transaction.on_commit(lambda: DashboardCache.bump(student.id))
+            
             return {'success': True}
         except Recommendation.DoesNotExist:
             return {'success': False, 'error': 'Recommendation not found'}
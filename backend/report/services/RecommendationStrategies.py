@@ -0,0 +1,261 @@
+"""
+report/services/RecommendationStrategies.py - Registered recommendation strategies
+"""
+from django.conf import settings
+from report.models import LessonNeighbor
+
+# name -> strategy instance, in registration (and evaluation) order
+STRATEGY_REGISTRY = {}
+
+
+def register_strategy(cls):
+    """Class decorator adding a strategy to STRATEGY_REGISTRY"""
+    STRATEGY_REGISTRY[cls.name] = cls()
+    return cls
+
+
+class RecommendationStrategy:
+    """
+    One source of recommendation candidates.
+
+    `recommend` reads the data loaded by a RecommendationEngine and returns
+    a list of {'lesson_id', 'reason', 'priority'} dicts. Fallback strategies
+    only run when every other strategy returned nothing. `max_ms` and
+    `max_queries` are the default budgets; RECOMMENDATION_STRATEGY_BUDGETS
+    overrides them per strategy name, and None means unlimited.
+    """
+
+    name = None
+    fallback = False
+    max_ms = None
+    max_queries = None
+
+    def recommend(self, engine):
+        raise NotImplementedError
+
+    def is_enabled(self):
+        return self.name not in getattr(settings, 'RECOMMENDATION_DISABLED_STRATEGIES', ())
+
+    def budget(self):
+        """(max_ms, max_queries) for this strategy"""
+        override = getattr(settings, 'RECOMMENDATION_STRATEGY_BUDGETS', {}).get(self.name, {})
+        return override.get('max_ms', self.max_ms), override.get('max_queries', self.max_queries)
+
+
+@register_strategy
+class InProgressStrategy(RecommendationStrategy):
+    name = 'in_progress'
+
+    def recommend(self, engine):
+        """Recommend lessons that are in progress (HIGH PRIORITY)"""
+        recommendations = []
+
+        in_progress = sorted(
+            (row for row in engine.progress if row['status'] == 'in_progress'),
+            key=lambda row: row['last_accessed'],
+            reverse=True
+        )[:3]
+
+        for row in in_progress:
+            days_since_access = (engine.now - row['last_accessed']).days
+            priority = 90 - (days_since_access * 5)
+
+            reason = f"You're {row['time_spent_minutes']} minutes into this lesson"
+            if days_since_access > 3:
+                reason += f" (last accessed {days_since_access} days ago)"
+
+            recommendations.append({
+                'lesson_id': row['lesson_id'],
+                'reason': reason,
+                'priority': max(priority, 70)
+            })
+
+        return recommendations
+
+
+@register_strategy
+class CourseGapsStrategy(RecommendationStrategy):
+    name = 'course_gaps'
+
+    def recommend(self, engine):
+        """Recommend completing courses with >50% progress"""
+        recommendations = []
+
+        for course_id in engine.published_course_ids:
+            total_lessons = len(engine.lessons_by_course[course_id])
+            if total_lessons == 0:
+                continue
+
+            completed_count = len(engine.completed_by_course[course_id])
+            progress_percentage = (completed_count / total_lessons) * 100
+
+            if 50 <= progress_percentage < 95:
+                next_lesson_id = engine.next_unfinished_lesson(course_id)
+                if next_lesson_id:
+                    recommendations.append({
+                        'lesson_id': next_lesson_id,
+                        'reason': f"You're {progress_percentage:.0f}% through {engine.courses[course_id]['title']} - finish strong!",
+                        'priority': 60 + int(progress_percentage * 0.3)
+                    })
+
+        return recommendations
+
+
+@register_strategy
+class NextLessonsStrategy(RecommendationStrategy):
+    name = 'next_lessons'
+
+    def recommend(self, engine):
+        """Recommend next sequential lessons in active courses"""
+        recommendations = []
+
+        for course_id in engine.recent_course_ids:
+            if course_id not in engine.courses:
+                continue
+
+            next_lesson_id = engine.next_unfinished_lesson(course_id)
+            # Every lesson before the first unfinished one is completed, so
+            # the previous lesson is done whenever there is one
+            if next_lesson_id and engine.lessons_by_course[course_id][0] != next_lesson_id:
+                recommendations.append({
+                    'lesson_id': next_lesson_id,
+                    'reason': f"Next lesson in {engine.courses[course_id]['title']}",
+                    'priority': 55
+                })
+
+        return recommendations
+
+
+@register_strategy
+class ReviewsStrategy(RecommendationStrategy):
+    name = 'reviews'
+
+    def recommend(self, engine):
+        """Recommend reviewing lessons with low time investment"""
+        recommendations = []
+
+        weak_lessons = sorted(
+            (
+                (row['time_spent_minutes'] * 100.0 / row['lesson__estimated_minutes'], row)
+                for row in engine.progress
+                if row['status'] == 'completed' and row['lesson__estimated_minutes'] > 0
+            ),
+            key=lambda item: item[0]
+        )
+
+        for time_ratio, row in weak_lessons[:2]:
+            if time_ratio >= 50:
+                break
+            recommendations.append({
+                'lesson_id': row['lesson_id'],
+                'reason': f"Quick review - you spent only {row['time_spent_minutes']}/{row['lesson__estimated_minutes']} min on this",
+                'priority': 40
+            })
+
+        return recommendations
+
+
+@register_strategy
+class SimilarLessonsStrategy(RecommendationStrategy):
+    name = 'similar_lessons'
+
+    def recommend(self, engine):
+        """Recommend lessons often completed by students who completed the same recent lessons"""
+        recommendations = []
+
+        recent_completions = sorted(
+            (row for row in engine.progress if row['status'] == 'completed'),
+            key=lambda row: row['last_accessed'],
+            reverse=True
+        )[:5]
+        if not recent_completions:
+            return recommendations
+
+        # One indexed lookup in the offline-built neighbour table
+        started = {row['lesson_id'] for row in engine.progress}
+        neighbors = LessonNeighbor.objects.filter(
+            lesson_id__in=[row['lesson_id'] for row in recent_completions],
+            neighbor__course__is_published=True
+        ).exclude(
+            neighbor_id__in=started
+        ).order_by('-score').values('neighbor_id', 'score', 'lesson__title')[:20]
+
+        seen = set()
+        for neighbor in neighbors:
+            if neighbor['neighbor_id'] in seen:
+                continue
+            seen.add(neighbor['neighbor_id'])
+            recommendations.append({
+                'lesson_id': neighbor['neighbor_id'],
+                'reason': f"Students who completed {neighbor['lesson__title']} went on to this lesson",
+                'priority': 45 + round(neighbor['score'] * 10)
+            })
+            if len(recommendations) == 3:
+                break
+
+        return recommendations
+
+
+@register_strategy
+class NewCoursesStrategy(RecommendationStrategy):
+    name = 'new_courses'
+
+    def recommend(self, engine):
+        """Suggest new courses if student is doing well"""
+        recommendations = []
+
+        for course_id in engine.published_course_ids:
+            total_lessons = len(engine.lessons_by_course[course_id])
+            if total_lessons == 0:
+                continue
+
+            if len(engine.completed_by_course[course_id]) == total_lessons:
+                new_course_ids = [
+                    new_id for new_id in engine.published_course_ids
+                    if new_id not in engine.started_course_ids
+                ][:2]
+
+                for new_id in new_course_ids:
+                    if engine.lessons_by_course[new_id]:
+                        recommendations.append({
+                            'lesson_id': engine.lessons_by_course[new_id][0],
+                            'reason': f"Start a new challenge: {engine.courses[new_id]['title']}",
+                            'priority': 30
+                        })
+                break
+
+        return recommendations
+
+
+@register_strategy
+class BeginnerCoursesStrategy(RecommendationStrategy):
+    name = 'beginner_courses'
+    fallback = True
+
+    def recommend(self, engine):
+        """Recommend beginner courses for new students"""
+        recommendations = []
+
+        beginner_course_ids = [
+            course_id for course_id in engine.published_course_ids
+            if engine.courses[course_id]['difficulty'] == 'beginner'
+        ][:3]
+
+        for course_id in beginner_course_ids:
+            if engine.lessons_by_course[course_id]:
+                recommendations.append({
+                    'lesson_id': engine.lessons_by_course[course_id][0],
+                    'reason': f"Start your learning journey with {engine.courses[course_id]['title']}",
+                    'priority': 85
+                })
+
+        if len(recommendations) == 0:
+            for course_id in engine.published_course_ids[:3]:
+                if engine.lessons_by_course[course_id]:
+                    recommendations.append({
+                        'lesson_id': engine.lessons_by_course[course_id][0],
+                        'reason': f"Begin with {engine.courses[course_id]['title']}",
+                        'priority': 80
+                    })
+
+        return recommendations
@@ -0,0 +1,387 @@
+"""
+report/services/StatsService.py - Denormalized student statistics
+"""
+from datetime import date as date_cls, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Sum, Count, Max, Q, F, Case, When, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from dashboard.service.DashboardCache import DashboardCache
+from users.models import User
+from ..models import Activity, ActivitySummary, DailyActivity, StudentStats
+
+# An active day continues the streak when it falls within this many days of
+# the previous one, so a single missed day does not break a streak
+STREAK_MAX_GAP_DAYS = 2
+
+
+# Gaps-and-islands over the distinct active days in DailyActivity: a day
+# opens a new streak when it is more than STREAK_MAX_GAP_DAYS after the
+# previous one, and a running sum of those openings numbers the streaks
+STREAK_ISLANDS_SQL = """
+    WITH days AS (
+        SELECT student_id, date,
+               CASE WHEN {gap} <= %s THEN 0 ELSE 1 END AS opens
+        FROM (
+            SELECT student_id, date,
+                   LAG(date) OVER (PARTITION BY student_id ORDER BY date) AS previous
+            FROM {table}
+            WHERE student_id IN ({placeholders})
+        ) ordered
+    ), islands AS (
+        SELECT student_id, date,
+               SUM(opens) OVER (PARTITION BY student_id ORDER BY date ROWS UNBOUNDED PRECEDING) AS island
+        FROM days
+    )
+    SELECT student_id, MIN(date), MAX(date), COUNT(*)
+    FROM islands
+    GROUP BY student_id, island
+    ORDER BY student_id, MIN(date)
+"""
+
+# Day difference between two DATE columns, per database vendor
+STREAK_GAP_EXPRESSIONS = {
+    'postgresql': 'date - previous',
+    'sqlite': 'julianday(date) - julianday(previous)',
+}
+
+
+class StatsService:
+    """Service class for the denormalized StudentStats table"""
+    
+    STREAK_HISTORY_KEY = 'streaks:student:{student_id}:v{version}'
+
+    @staticmethod
+    def apply_progress_change(student_id, old_status=None, new_status=None,
+                              time_delta=0, new_course=False, last_activity=None):
+        """
+        Apply the effect of a single progress write to StudentStats.
+        Must run inside the transaction that wrote the Progress row.
+        `old_status` is None when the Progress row was just created.
+        """
+        StatsService.apply_deltas(
+            student_id,
+            completed=(new_status == 'completed') - (old_status == 'completed'),
+            in_progress=(new_status == 'in_progress') - (old_status == 'in_progress'),
+            time_spent=time_delta,
+            courses_touched=int(new_course),
+            last_activity=last_activity
+        )
+
+    @staticmethod
+    def apply_deltas(student_id, completed=0, in_progress=0, time_spent=0,
+                     courses_touched=0, last_activity=None):
+        """
+        Apply summed counter deltas to StudentStats with a single UPDATE.
+        Must run inside the transaction that wrote the Progress rows.
+        """
+        updates = {}
+        if completed:
+            updates['completed'] = F('completed') + completed
+        if in_progress:
+            updates['in_progress'] = F('in_progress') + in_progress
+        if time_spent:
+            updates['total_time_minutes'] = F('total_time_minutes') + time_spent
+        if courses_touched:
+            updates['courses_touched'] = F('courses_touched') + courses_touched
+        if last_activity is not None:
+            updates['last_activity'] = last_activity
+
+        if not updates:
+            return
+
+        updates['updated_at'] = timezone.now()
+        updated = StudentStats.objects.filter(student_id=student_id).update(**updates)
+        if not updated:
+            # No row yet: build it from Progress, which already holds these writes
+            StatsService.rebuild(student_ids=[student_id])
+
+    @staticmethod
+    def record_active_day(student_id, date):
+        """
+        Fold one active day into the stored streak with a single UPDATE.
+        A day older than `last_active_date` (a backdated batch item) can join
+        or split earlier streaks, so the student's streaks are recounted from
+        DailyActivity instead.
+        """
+        current = Case(
+            When(last_active_date__gte=date, then=F('current_streak')),
+            When(
+                last_active_date__gte=date - timedelta(days=STREAK_MAX_GAP_DAYS),
+                then=F('current_streak') + 1
+            ),
+            default=Value(1)
+        )
+        in_order = Q(last_active_date__isnull=True) | Q(last_active_date__lte=date)
+        updated = StudentStats.objects.filter(in_order, student_id=student_id).update(
+            current_streak=current,
+            longest_streak=Greatest(F('longest_streak'), current),
+            streak_count=Case(
+                When(
+                    last_active_date__gte=date - timedelta(days=STREAK_MAX_GAP_DAYS),
+                    then=F('streak_count')
+                ),
+                default=F('streak_count') + 1
+            ),
+            last_active_date=Value(date),
+            updated_at=timezone.now()
+        )
+        if updated:
+            return
+        if StudentStats.objects.filter(student_id=student_id).exists():
+            StatsService.recount_streaks(student_id)
+        else:
+            # No row yet: build it from history, which already holds this day
+            StatsService.rebuild(student_ids=[student_id])
+    
+    @staticmethod
+    def recount_streaks(student_id):
+        """Recompute one student's stored streak fields from their DailyActivity days"""
+        history = StatsService.streak_islands([student_id]).get(student_id, [])
+        StudentStats.objects.filter(student_id=student_id).update(
+            current_streak=history[-1][2] if history else 0,
+            longest_streak=max((days for _, _, days in history), default=0),
+            last_active_date=history[-1][1] if history else None,
+            streak_count=len(history),
+            updated_at=timezone.now()
+        )
+    
+    @staticmethod
+    def current_streak(stats, today=None):
+        """
+        The stored streak, or 0 once the student has missed today and yesterday
+        Pass the student's local `today`; it defaults to the server date.
+        """
+        today = today or timezone.now().date()
+        if stats.last_active_date is None or (today - stats.last_active_date).days > 1:
+            return 0
+        return stats.current_streak
+    
+    @staticmethod
+    def _compute_streaks(student_ids=None):
+        """
+        Walk distinct active dates per student, oldest first, from raw
+        activities and compacted summaries.
+        Returns {student_id: (current_streak, longest_streak, last_active_date, streak_count)}.
+        """
+        raw_days = Activity.objects.all()
+        compacted_days = ActivitySummary.objects.all()
+        if student_ids is not None:
+            raw_days = raw_days.filter(student_id__in=student_ids)
+            compacted_days = compacted_days.filter(student_id__in=student_ids)
+        # UNION also removes days present in both
+        days = raw_days.order_by().values_list('student_id', 'date').union(
+            compacted_days.order_by().values_list('student_id', 'date')
+        ).order_by('student_id', 'date')
+        
+        streaks = {}
+        for student_id, date in days.iterator(chunk_size=2000):
+            current, longest, last, count = streaks.get(student_id, (0, 0, None, 0))
+            if last is not None and (date - last).days <= STREAK_MAX_GAP_DAYS:
+                current += 1
+            else:
+                current = 1
+                count += 1
+            streaks[student_id] = (current, max(longest, current), date, count)
+        return streaks
+    
+    @staticmethod
+    def streak_islands(student_ids):
+        """
+        Every streak of each student as one window-function query over
+        DailyActivity, chunked by student.
+        Returns {student_id: [(start_date, end_date, active_days), ...]}, oldest first.
+        Falls back to walking the dates in Python on databases without
+        window functions.
+        """
+        gap = STREAK_GAP_EXPRESSIONS.get(connection.vendor)
+        if gap is None or not connection.features.supports_over_clause:
+            return StatsService._walk_streak_islands(student_ids)
+        
+        student_ids = list(student_ids)
+        islands = {}
+        with connection.cursor() as cursor:
+            for i in range(0, len(student_ids), 500):
+                chunk = student_ids[i:i + 500]
+                cursor.execute(
+                    STREAK_ISLANDS_SQL.format(
+                        gap=gap,
+                        table=DailyActivity._meta.db_table,
+                        placeholders=', '.join(['%s'] * len(chunk))
+                    ),
+                    [STREAK_MAX_GAP_DAYS, *chunk]
+                )
+                for student_id, start, end, days in cursor.fetchall():
+                    # SQLite returns aggregated dates as text
+                    if isinstance(start, str):
+                        start, end = date_cls.fromisoformat(start), date_cls.fromisoformat(end)
+                    islands.setdefault(student_id, []).append((start, end, days))
+        return islands
+    
+    @staticmethod
+    def _walk_streak_islands(student_ids):
+        """Python fallback for streak_islands"""
+        islands = {}
+        days = DailyActivity.objects.filter(
+            student_id__in=list(student_ids)
+        ).order_by('student_id', 'date').values_list('student_id', 'date')
+        for student_id, date in days.iterator(chunk_size=2000):
+            student_islands = islands.setdefault(student_id, [])
+            if student_islands and (date - student_islands[-1][1]).days <= STREAK_MAX_GAP_DAYS:
+                start, _, length = student_islands[-1]
+                student_islands[-1] = (start, date, length + 1)
+            else:
+                student_islands.append((date, date, 1))
+        return islands
+    
+    @staticmethod
+    def get_streak_histories(student_ids):
+        """
+        Streak histories for many students, cached per student under the
+        dashboard version so any activity write invalidates them. Only the
+        students missing from the cache are computed, in one query.
+        Returns {student_id: [(start_date, end_date, active_days), ...]}.
+        Without a shared cache every history is computed.
+        """
+        student_ids = list(student_ids)
+        if not DashboardCache.is_enabled():
+            islands = StatsService.streak_islands(student_ids)
+            return {student_id: islands.get(student_id, []) for student_id in student_ids}
+        
+        versions = DashboardCache.get_versions(student_ids)
+        keys = {
+            StatsService.STREAK_HISTORY_KEY.format(student_id=student_id, version=versions[student_id]): student_id
+            for student_id in student_ids
+        }
+        histories = {keys[key]: history for key, history in cache.get_many(list(keys)).items()}
+        
+        missing = [student_id for student_id in student_ids if student_id not in histories]
+        if missing:
+            islands = StatsService.streak_islands(missing)
+            computed = {student_id: islands.get(student_id, []) for student_id in missing}
+            cache.set_many(
+                {key: computed[student_id] for key, student_id in keys.items() if student_id in computed},
+                timeout=getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300)
+            )
+            histories.update(computed)
+        return histories
+    
+    @staticmethod
+    def summarize_streaks(history, today):
+        """
+        Current streak, longest streak and streak count from a history.
+        The current streak is 0 once `today` and the day before were missed,
+        as in current_streak.
+        """
+        current = 0
+        if history and (today - history[-1][1]).days <= 1:
+            current = history[-1][2]
+        return {
+            'current_streak': current,
+            'longest_streak': max((days for _, _, days in history), default=0),
+            'streak_count': len(history)
+        }
+    
+    @staticmethod
+    def rebuild_streaks(student_ids=None):
+        """
+        Recompute the stored streak fields from Activity history.
+        Rebuilds every student when `student_ids` is None.
+        Returns the number of rows written.
+        """
+        StatsService.ensure_rows()
+        streaks = StatsService._compute_streaks(student_ids)
+        
+        rows = StudentStats.objects.all()
+        if student_ids is not None:
+            rows = rows.filter(student_id__in=student_ids)
+        
+        now = timezone.now()
+        updated = []
+        for stats in rows.only('student_id').iterator(chunk_size=1000):
+            stats.current_streak, stats.longest_streak, stats.last_active_date, stats.streak_count = (
+                streaks.get(stats.student_id, (0, 0, None, 0))
+            )
+            stats.updated_at = now
+            updated.append(stats)
+        
+        with transaction.atomic():
+            StudentStats.objects.bulk_update(
+                updated,
+                ['current_streak', 'longest_streak', 'last_active_date', 'streak_count', 'updated_at'],
+                batch_size=500
+            )
+        return len(updated)
+    
+    @staticmethod
+    def get_stats(student):
+        """Get the StudentStats row for a student, building it if missing"""
+        stats = StudentStats.objects.filter(student_id=student.id).first()
+        if stats is None:
+            StatsService.rebuild(student_ids=[student.id])
+            stats = StudentStats.objects.get(student_id=student.id)
+        return stats
+
+    @staticmethod
+    def ensure_rows():
+        """Create StudentStats rows for students that do not have one yet"""
+        missing_ids = list(
+            User.objects.filter(role='student', stats__isnull=True).values_list('id', flat=True)
+        )
+        if missing_ids:
+            StatsService.rebuild(student_ids=missing_ids)
+        return len(missing_ids)
+
+    @staticmethod
+    def rebuild(student_ids=None):
+        """
+        Recompute StudentStats from Progress and Activity history.
+        Rebuilds every student when `student_ids` is None.
+        Returns the number of rows written.
+        """
+        students = User.objects.filter(role='student')
+        if student_ids is not None:
+            students = User.objects.filter(id__in=student_ids)
+
+        aggregates = students.annotate(
+            completed=Count('progress_records', filter=Q(progress_records__status='completed')),
+            in_progress=Count('progress_records', filter=Q(progress_records__status='in_progress')),
+            total_time=Sum('progress_records__time_spent_minutes'),
+            courses_touched=Count('progress_records__lesson__course', distinct=True),
+            last_activity=Max('progress_records__last_accessed')
+        ).values('id', 'completed', 'in_progress', 'total_time', 'courses_touched', 'last_activity')
+
+        streaks = StatsService._compute_streaks(student_ids)
+        rows = []
+        for row in aggregates:
+            current_streak, longest_streak, last_active_date, streak_count = streaks.get(
+                row['id'], (0, 0, None, 0)
+            )
+            rows.append(StudentStats(
+                student_id=row['id'],
+                completed=row['completed'],
+                in_progress=row['in_progress'],
+                total_time_minutes=row['total_time'] or 0,
+                courses_touched=row['courses_touched'],
+                last_activity=row['last_activity'],
+                current_streak=current_streak,
+                longest_streak=longest_streak,
+                streak_count=streak_count,
+                last_active_date=last_active_date
+            ))
+
+        with transaction.atomic():
+            StudentStats.objects.bulk_create(
+                rows,
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=['student'],
+                update_fields=[
+                    'completed', 'in_progress', 'total_time_minutes', 'courses_touched', 'last_activity',
+                    'current_streak', 'longest_streak', 'streak_count', 'last_active_date', 'updated_at'
+                ]
+            )
+        return len(rows)
@@ -9,7 +9,11 @@ app_name = 'report'
 urlpatterns = [
     path('', views.get_student_progress, name='list'),
     path('update', views.update_progress, name='update'),
+    path('update/batch', views.batch_update_progress, name='batch_update'),
+    path('heartbeat', views.heartbeat, name='heartbeat'),
+    path('activities/batch', views.batch_log_activities, name='batch_log_activities'),
     path('complete/<int:lesson_id>', views.mark_lesson_complete, name='complete'),
+    path('next/<int:course_id>', views.get_next_lesson, name='next_lesson'),
     path('recommendations/generate', views.generate_recommendations, name='generate_recommendations'),
     path('recommendations/<int:recommendation_id>/dismiss', views.dismiss_recommendation, name='dismiss_recommendation'),
     path('recommendations', views.get_recommendations, name='get_recommendations'),
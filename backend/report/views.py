@@ -5,11 +5,32 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from .serializers import ProgressSerializer, UpdateProgressSerializer
+from django.conf import settings
+from .idempotency import idempotent
+from .serializers import ProgressSerializer, UpdateProgressSerializer, HeartbeatSerializer, ActivityBatchItemSerializer
 from .services.ProgressService import ProgressService
 from .services.ActivityService import ActivityService
+from .services.CourseProgressService import CourseProgressService
+from .services.ProgressEventService import ProgressEventService
 from report.services.RecommendationService import RecommendationService
 
+
+def _queue_progress_events(student, updates):
+    """Append progress updates to the event log (PROGRESS_WRITE_MODE='events')"""
+    result = ProgressEventService.record(student, updates)
+    if not result['success']:
+        return Response({
+            'success': False,
+            'error': result['error']
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({
+        'success': True,
+        'message': 'Progress update queued',
+        'event_ids': [event.id for event in result['events']]
+    }, status=status.HTTP_202_ACCEPTED)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_student_progress(request):
@@ -44,6 +65,7 @@ def get_student_progress(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def update_progress(request):
     """Update progress for a lesson"""
     try:
@@ -60,6 +82,9 @@ def update_progress(request):
                 'errors': serializer.errors
             }, status=status.HTTP_400_BAD_REQUEST)
         
+        if ProgressEventService.is_enabled():
+            return _queue_progress_events(request.user, [serializer.validated_data])
+        
         result = ProgressService.update_progress(
             student=request.user,
             lesson_id=serializer.validated_data['lesson_id'],
@@ -90,6 +115,170 @@ def update_progress(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
+def batch_update_progress(request):
+    """Update progress for many lessons in one request"""
+    try:
+        if request.user.role != 'student':
+            return Response({
+                'success': False,
+                'error': 'Only students can update progress'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        serializer = UpdateProgressSerializer(
+            data=request.data,
+            many=True,
+            allow_empty=False,
+            max_length=settings.PROGRESS_BATCH_MAX_SIZE
+        )
+        if not serializer.is_valid():
+            return Response({
+                'success': False,
+                'errors': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if ProgressEventService.is_enabled():
+            return _queue_progress_events(request.user, serializer.validated_data)
+        
+        result = ProgressService.batch_update_progress(
+            student=request.user,
+            updates=serializer.validated_data
+        )
+        
+        if not result['success']:
+            return Response({
+                'success': False,
+                'error': result['error']
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        progress_serializer = ProgressSerializer(result['progress'], many=True)
+        return Response({
+            'success': True,
+            'message': 'Progress updated successfully',
+            'data': progress_serializer.data
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def heartbeat(request):
+    """Record time spent in the lesson player since the previous heartbeat"""
+    try:
+        if request.user.role != 'student':
+            return Response({
+                'success': False,
+                'error': 'Only students can send heartbeats'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        serializer = HeartbeatSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                'success': False,
+                'errors': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        from .services.HeartbeatBuffer import heartbeat_buffer
+        heartbeat_buffer.add(
+            request.user.id,
+            serializer.validated_data['lesson_id'],
+            serializer.validated_data['seconds']
+        )
+        
+        return Response({
+            'success': True,
+            'message': 'Heartbeat recorded'
+        }, status=status.HTTP_202_ACCEPTED)
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def batch_log_activities(request):
+    """
+    POST /api/report/activities/batch
+    Log a burst of player events; each item is accepted or rejected on its own
+    """
+    try:
+        if request.user.role != 'student':
+            return Response({
+                'success': False,
+                'error': 'Only students can log activities'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response({
+                'success': False,
+                'error': 'Expected a non-empty list of activities'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > settings.ACTIVITY_BATCH_MAX_SIZE:
+            return Response({
+                'success': False,
+                'error': f'At most {settings.ACTIVITY_BATCH_MAX_SIZE} activities per request'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        results = []
+        valid = []
+        for index, item in enumerate(items):
+            serializer = ActivityBatchItemSerializer(data=item)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+                results.append({'index': index, 'accepted': True})
+            else:
+                results.append({'index': index, 'accepted': False, 'errors': serializer.errors})
+        
+        # One query for every referenced lesson
+        from courses.models import Lesson
+        lesson_ids = {data['lesson_id'] for _, data in valid if data.get('lesson_id') is not None}
+        known_lessons = set(Lesson.objects.filter(id__in=lesson_ids).values_list('id', flat=True))
+        accepted = []
+        for index, data in valid:
+            lesson_id = data.get('lesson_id')
+            if lesson_id is not None and lesson_id not in known_lessons:
+                results[index] = {
+                    'index': index,
+                    'accepted': False,
+                    'errors': {'lesson': [f'Lesson {lesson_id} not found']}
+                }
+            else:
+                accepted.append(data)
+        
+        if accepted:
+            result = ActivityService.log_activities(request.user, accepted)
+            if not result['success']:
+                return Response({
+                    'success': False,
+                    'error': result['error']
+                }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'success': True,
+            'accepted': len(accepted),
+            'rejected': len(items) - len(accepted),
+            'results': results
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@idempotent
 def mark_lesson_complete(request, lesson_id):
     """Mark a lesson as complete"""
     try:
@@ -101,6 +290,13 @@ def mark_lesson_complete(request, lesson_id):
         
         time_spent = request.data.get('time_spent', 0)
         
+        if ProgressEventService.is_enabled():
+            return _queue_progress_events(request.user, [{
+                'lesson_id': lesson_id,
+                'status': 'completed',
+                'time_spent': time_spent
+            }])
+        
         result = ProgressService.mark_lesson_complete(
             student=request.user,
             lesson_id=lesson_id,
@@ -126,6 +322,34 @@ def mark_lesson_complete(request, lesson_id):
             'error': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_next_lesson(request, course_id):
+    """
+    GET /api/report/next/<course_id>
+    Get the student's next unfinished lesson of a course
+    """
+    if request.user.role != 'student':
+        return Response({
+            'success': False,
+            'error': 'Only students can get their next lesson'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    result = CourseProgressService.get_next_lesson(request.user, course_id)
+    
+    if result['success']:
+        return Response({
+            'success': True,
+            'data': result['data']
+        })
+    else:
+        return Response({
+            'success': False,
+            'error': result['error']
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_recommendations(request):
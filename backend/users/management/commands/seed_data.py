@@ -18,6 +18,8 @@ import random
 from users.models import User
 from courses.models import Course, Lesson
 from report.models import Progress, Activity
+from report.services.ActivityService import ActivityService
+from report.services.StatsService import StatsService
 
 
 class Command(BaseCommand):
@@ -56,6 +58,13 @@ class Command(BaseCommand):
                 self.stdout.write('Creating activity data...')
                 self.create_activity_data(users)
                 
+                # Rebuild denormalized stats
+                self.stdout.write('Rebuilding student stats...')
+                StatsService.rebuild()
+                
+                self.stdout.write('Rebuilding daily activity rollups...')
+                ActivityService.rebuild_daily_rollups()
+                
                 self.stdout.write(self.style.SUCCESS('Successfully seeded database!'))
         
         except Exception as e:
@@ -1,3 +1,6 @@
+from datetime import timezone as dt_timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 from django.db import models
 from django.utils import timezone
@@ -42,6 +45,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_staff = models.BooleanField(default=False)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
+    # IANA name; activity dates are bucketed on the student's local day
+    timezone = models.CharField(max_length=64, default='UTC')
     
     # Add these two lines to fix the error:
     groups = models.ManyToManyField('auth.Group', related_name='custom_users', blank=True)
@@ -55,6 +60,11 @@ class User(AbstractBaseUser, PermissionsMixin):
     class Meta:
         db_table = 'users'
         ordering = ['-created_at']
+        indexes = [
+            # Reason: keyset pagination ORDER BY created_at, id
+            # Used in: DashboardService.get_mentor_dashboard_data (sort=created)
+            models.Index(fields=['created_at', 'id']),
+        ]
     
     def __str__(self):
         return self.email
@@ -65,4 +75,16 @@ class User(AbstractBaseUser, PermissionsMixin):
     
     def save(self, *args, **kwargs):
         self.email = self.email.lower()
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+    
+    @staticmethod
+    def get_tzinfo(name):
+        """ZoneInfo for an IANA name, falling back to UTC for unknown names"""
+        try:
+            return ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError, TypeError):
+            return dt_timezone.utc
+    
+    def local_date(self, value=None):
+        """The date of `value` (default: now) in this user's timezone"""
+        return timezone.localtime(value or timezone.now(), User.get_tzinfo(self.timezone)).date()
@@ -1,10 +1,21 @@
 """
 users/serializers.py - User serializers
 """
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
 from rest_framework import serializers
 from .models import User
 
 
+def validate_timezone_name(value):
+    """Reject names that are not IANA timezones"""
+    try:
+        ZoneInfo(value)
+    except (ZoneInfoNotFoundError, ValueError, TypeError):
+        raise serializers.ValidationError(f'Unknown timezone: {value}')
+    return value
+
+
 class UserSerializer(serializers.ModelSerializer):
     """User serializer"""
     
@@ -12,7 +23,7 @@ class UserSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = User
-        fields = ['id', 'email', 'first_name', 'last_name', 'full_name', 'role', 'is_active', 'created_at', 'last_login']
+        fields = ['id', 'email', 'first_name', 'last_name', 'full_name', 'role', 'timezone', 'is_active', 'created_at', 'last_login']
         read_only_fields = ['id', 'created_at', 'last_login', 'is_active']
 
 
@@ -25,6 +36,7 @@ class RegisterSerializer(serializers.Serializer):
     first_name = serializers.CharField(required=True, max_length=150)
     last_name = serializers.CharField(required=True, max_length=150)
     role = serializers.ChoiceField(choices=['student', 'mentor'], default='student')
+    timezone = serializers.CharField(required=False, default='UTC', max_length=64, validators=[validate_timezone_name])
     
     def validate(self, data):
         if data['password'] != data['password_confirm']:
@@ -3,15 +3,17 @@ users/services.py - User business logic
 """
 from django.contrib.auth import authenticate
 from django.db import transaction
+from rest_framework import serializers
 from rest_framework_simplejwt.tokens import RefreshToken
 from ..models import User
+from ..serializers import validate_timezone_name
 
 
 class UserService:
     """Service class for user operations"""
     
     @staticmethod
-    def register_user(email, password, first_name, last_name, role='student'):
+    def register_user(email, password, first_name, last_name, role='student', timezone='UTC'):
         """Register a new user"""
         try:
             with transaction.atomic():
@@ -20,7 +22,8 @@ class UserService:
                     password=password,
                     first_name=first_name,
                     last_name=last_name,
-                    role=role
+                    role=role,
+                    timezone=timezone
                 )
                 return {'success': True, 'user': user}
         except Exception as e:
@@ -80,6 +83,12 @@ class UserService:
             with transaction.atomic():
                 user = User.objects.get(id=user_id)
                 
+                if 'timezone' in kwargs:
+                    try:
+                        validate_timezone_name(kwargs['timezone'])
+                    except serializers.ValidationError as e:
+                        return {'success': False, 'error': str(e.detail[0])}
+                
                 for key, value in kwargs.items():
                     if hasattr(user, key):
                         setattr(user, key, value)
@@ -26,7 +26,8 @@ def register(request):
             password=serializer.validated_data['password'],
             first_name=serializer.validated_data['first_name'],
             last_name=serializer.validated_data['last_name'],
-            role=serializer.validated_data.get('role', 'student')
+            role=serializer.validated_data.get('role', 'student'),
+            timezone=serializer.validated_data.get('timezone', 'UTC')
         )
         
         if not result['success']:
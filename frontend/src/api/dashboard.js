@@ -2,15 +2,15 @@
 import api from './axios';
 
 export const dashboardAPI = {
-  // Get dashboard data
-  getDashboard: async () => {
-    const response = await api.get('/dashboard/');
+  // Get dashboard data (mentors may pass sort/order/band/q/cursor/limit)
+  getDashboard: async (params = {}) => {
+    const response = await api.get('/dashboard/', { params });
     return response.data;
   },
 
-  // Get time series data
-  getTimeSeries: async (days = 30) => {
-    const response = await api.get(`/dashboard/timeseries?days=${days}`);
+  // Get time series data (days, or start/end with granularity=day|week|month)
+  getTimeSeries: async (params = { days: 30 }) => {
+    const response = await api.get('/dashboard/timeseries', { params });
     return response.data;
   },
 
@@ -18,6 +18,7 @@ const Dashboard = () => {
   const { user, isStudent } = useAuth();
   const [loading, setLoading] = useState(true);
   const [dashboardData, setDashboardData] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     fetchDashboard();
@@ -34,6 +35,24 @@ const Dashboard = () => {
     }
   };
 
+  const fetchMoreStudents = async () => {
+    if (!dashboardData?.next_cursor) return;
+    setLoadingMore(true);
+    try {
+      const response = await dashboardAPI.getDashboard({ cursor: dashboardData.next_cursor });
+      setDashboardData((prev) => ({
+        ...prev,
+        students: [...prev.students, ...response.data.students],
+        next_cursor: response.data.next_cursor,
+        has_more: response.data.has_more,
+      }));
+    } catch (error) {
+      console.error('Failed to fetch more students:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleDismissRecommendation = async (recId) => {
     try {
       await dashboardAPI.dismissRecommendation(recId);
@@ -236,7 +255,14 @@ const Dashboard = () => {
   }
 
   // Mentor Dashboard
-  const { total_students, average_completion_rate, students, students_needing_help } = dashboardData;
+  const {
+    total_students,
+    average_completion_rate,
+    students,
+    students_needing_help,
+    students_needing_help_count,
+    has_more
+  } = dashboardData;
 
   return (
     <>
@@ -277,7 +303,7 @@ const Dashboard = () => {
                 <div className="p-3 bg-orange-100 rounded-xl">
                   <Award className="h-6 w-6 text-orange-600" />
                 </div>
-                <span className="text-3xl font-bold text-gray-900">{students_needing_help.length}</span>
+                <span className="text-3xl font-bold text-gray-900">{students_needing_help_count}</span>
               </div>
               <p className="text-gray-600 font-medium">Students Needing Help</p>
             </div>
@@ -340,6 +366,17 @@ const Dashboard = () => {
                 </div>
               ))}
             </div>
+            {has_more && (
+              <div className="mt-6 text-center">
+                <button
+                  onClick={fetchMoreStudents}
+                  disabled={loadingMore}
+                  className="px-6 py-2 rounded-lg bg-blue-600 text-white font-medium hover:bg-blue-700 disabled:opacity-50"
+                >
+                  {loadingMore ? 'Loading...' : 'Load more students'}
+                </button>
+              </div>
+            )}
           </div>
         </div>
       </div>